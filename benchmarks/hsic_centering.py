@@ -0,0 +1,94 @@
+"""
+Time and peak memory of HSIC with the dense centering matrix (the former
+implementation of `HSIC.criterion`) against the centering-matrix-free
+estimates of `glow.utils.hsic_utils`, for a growing batch size m.
+
+Every measurement runs in a forked process so that the peak resident set
+size of the process reflects only that measurement.
+
+    python benchmarks/hsic_centering.py --sizes 256 512 1024 2048 4096
+
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+import torch
+from glow.utils import hsic_utils as kernel_module
+
+
+def dense_centering(K_x, K_y):
+    # former implementation of HSIC.criterion
+    m = K_x.shape[0]
+    H = torch.eye(m, m) - (1 / m) * torch.ones(m, m)
+    H = H.to(K_x)
+    matrix_x = torch.mm(K_x, H)
+    matrix_y = torch.mm(K_y, H)
+    return (1 / (m - 1)) * torch.trace(torch.mm(matrix_x, matrix_y))
+
+
+METHODS = {
+    "dense": dense_centering,
+    "biased": kernel_module.hsic_biased,
+    "unbiased": kernel_module.hsic_unbiased,
+}
+
+
+def grams(m, dim, dtype):
+    torch.manual_seed(0)
+    x = torch.randn(m, dim, dtype=dtype)
+    y = torch.tanh(x @ torch.randn(dim, dim, dtype=dtype))
+    params_dict = {"sigma": dim ** 0.5}
+    K_x = kernel_module.gaussian_kernel(x, x, params_dict)
+    K_y = kernel_module.gaussian_kernel(y, y, params_dict)
+    return K_x, K_y
+
+
+def measure(method, K_x, K_y, repeats, queue):
+    # memory of the first call, which also warms up the timing
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    METHODS[method](K_x, K_y)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base
+    start = time.perf_counter()
+    for _ in range(repeats):
+        value = METHODS[method](K_x, K_y)
+    elapsed = (time.perf_counter() - start) / repeats
+    queue.put((elapsed, peak * 1024, float(value)))
+
+
+def run(method, K_x, K_y, repeats):
+    # the Gram matrices are built before forking so that their temporaries
+    # do not count towards the peak of the child
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    process = context.Process(target=measure, args=(method, K_x, K_y, repeats, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256, 512, 1024, 2048])
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--float64", action="store_true")
+    args = parser.parse_args()
+    dtype = torch.float64 if args.float64 else torch.float32
+
+    print(
+        "%8s %10s %12s %12s %14s" % ("m", "method", "time (ms)", "peak (MiB)", "HSIC")
+    )
+    for m in args.sizes:
+        K_x, K_y = grams(m, args.dim, dtype)
+        for method in METHODS.keys():
+            elapsed, peak, value = run(method, K_x, K_y, args.repeats)
+            print(
+                "%8d %10s %12.2f %12.1f %14.6g"
+                % (m, method, 1000 * elapsed, peak / 2 ** 20, value)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Crossover between the feature space formulation |X^T H Y|^2 and the Gram
+matrix formulation of HSIC with linear kernel, for a grid of batch sizes m
+and layer widths d (with targets of width `--target-dim`). For every point
+the faster path is compared with the choice of `HSIC.use_feature_space`,
+which picks the feature space when d_x d_y < m (d_x + d_y).
+
+    python benchmarks/hsic_linear_crossover.py --sizes 256 1024 --dims 16 256 2048
+
+"""
+import argparse
+import time
+import torch
+from glow.information_bottleneck import HSIC
+from glow.utils import hsic_utils as kernel_module
+
+
+def timeit(function, repeats):
+    function()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[128, 512, 2048])
+    parser.add_argument(
+        "--dims", type=int, nargs="+", default=[16, 64, 256, 1024, 4096]
+    )
+    parser.add_argument("--target-dim", type=int, default=None)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    estimator = HSIC("linear", gpu=False)
+
+    print(
+        "%6s %6s %6s %14s %14s %9s %9s"
+        % ("m", "d_x", "d_y", "features (ms)", "gram (ms)", "faster", "chosen")
+    )
+    mismatches = 0
+    for m in args.sizes:
+        for d in args.dims:
+            d_y = d if args.target_dim is None else args.target_dim
+            torch.manual_seed(0)
+            x = torch.randn(m, d)
+            y = torch.randn(m, d_y)
+
+            def features():
+                return kernel_module.hsic_features(x, y)
+
+            def gram():
+                K_x = kernel_module.linear_kernel(x, x, {})
+                K_y = kernel_module.linear_kernel(y, y, {})
+                return kernel_module.hsic_biased(K_x, K_y)
+
+            time_features = timeit(features, args.repeats)
+            time_gram = timeit(gram, args.repeats)
+            faster = "features" if time_features < time_gram else "gram"
+            chosen = "features" if estimator.use_feature_space(x, y) else "gram"
+            mismatches += faster != chosen
+            print(
+                "%6d %6d %6d %14.3f %14.3f %9s %9s"
+                % (m, d, d_y, 1000 * time_features, 1000 * time_gram, faster, chosen)
+            )
+    print("heuristic differs from the faster path for %d points" % mismatches)
+
+
+if __name__ == "__main__":
+    main()
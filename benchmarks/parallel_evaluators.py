@@ -0,0 +1,112 @@
+"""
+Scaling of the evaluation of one dynamics segment by four evaluators (HSIC,
+KNN, EDGE and MatrixRenyi) with `glow.dynamics.ParallelEvaluator` against
+evaluating them one after another, for a growing number of evaluator
+workers, and through `glow.dynamics.AsyncDynamics` with a stream of
+segments.
+
+The speedup is bounded by the number of cores, `torch.get_num_threads()`
+is split between the workers, so a single core shows no speedup.
+
+    python benchmarks/parallel_evaluators.py --batch-size 2048 --workers 1 2 4
+
+"""
+import argparse
+import time
+import torch
+import glow.dynamics as dynamics_module
+from glow.information_bottleneck import EDGE, HSIC, KNN, MatrixRenyi
+
+
+def evaluators():
+    return [
+        HSIC("gaussian", gpu=False, sigma=4.0),
+        KNN(gpu=False),
+        EDGE("floor_hash", gpu=False, F=1.0, epsilon=0.5, b=0.25),
+        MatrixRenyi("gaussian", gpu=False, sigma=4.0),
+    ]
+
+
+def dynamics_segment(m, dims, num_classes):
+    torch.manual_seed(0)
+    segment = [torch.randn(m, dims[0])]
+    for d in dims[1:]:
+        W = torch.randn(segment[-1].shape[1], d) / segment[-1].shape[1] ** 0.5
+        segment.append(torch.relu(segment[-1] @ W))
+    return segment + [torch.randint(0, num_classes, (m,))]
+
+
+def sequential(segment, evaluator_list):
+    handler = dynamics_module.get(segment)
+    values = [handler.evaluate(evaluator) for evaluator in evaluator_list]
+    handler.release()
+    return values
+
+
+def parallel(segment, evaluator_list, parallel_evaluator):
+    handler = dynamics_module.get(segment)
+    values = parallel_evaluator.evaluate(handler, evaluator_list)
+    handler.release()
+    return values
+
+
+def asynchronous(segments, evaluator_list, workers):
+    handler = dynamics_module.AsyncDynamics(
+        evaluator_list, num_workers=1, evaluator_workers=workers
+    )
+    for segment in segments:
+        handler.submit(segment)
+    values = handler.drain()
+    handler.close()
+    return values
+
+
+def timeit(function, repeats):
+    function()  # warm up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--dims", type=int, nargs="+", default=[64, 32, 16])
+    parser.add_argument("--num-classes", type=int, default=10)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--segments", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    segment = dynamics_segment(args.batch_size, args.dims, args.num_classes)
+    segments = [segment] * args.segments
+    evaluator_list = evaluators()
+    print("intra-op threads: %d" % torch.get_num_threads())
+
+    baseline = timeit(lambda: sequential(segment, evaluator_list), args.repeats)
+    print("%12s %8s %14s %8s" % ("mode", "workers", "segment (ms)", "speedup"))
+    print("%12s %8d %14.1f %8.2f" % ("sequential", 1, 1000 * baseline, 1.0))
+    for workers in args.workers:
+        parallel_evaluator = dynamics_module.ParallelEvaluator(workers)
+        elapsed = timeit(
+            lambda: parallel(segment, evaluator_list, parallel_evaluator),
+            args.repeats,
+        )
+        parallel_evaluator.close()
+        print(
+            "%12s %8d %14.1f %8.2f"
+            % ("parallel", workers, 1000 * elapsed, baseline / elapsed)
+        )
+    for workers in args.workers:
+        elapsed = timeit(
+            lambda: asynchronous(segments, evaluator_list, workers), args.repeats
+        )
+        elapsed = elapsed / args.segments
+        print(
+            "%12s %8d %14.1f %8.2f"
+            % ("async", workers, 1000 * elapsed, baseline / elapsed)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,16 @@
+import json
+import math
+import os
+import queue
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import torch
 from torch import nn
 from tqdm import tqdm
+from contextlib import ExitStack
+from glow.utils.hsic_utils import GramCache
 
 
 class Dynamics:
@@ -10,11 +19,18 @@ class Dynamics:
 
     Arguments:
         dynamics_segment (iterable): smallest segment of the dynamics of a batch containing input, hidden layer output and label in form of :class:`torch.Tensor` objects
+        sketches (glow.utils.quantile_sketch.ActivationSketches, optional): streaming quantile sketches of the hidden layers which are made available to the evaluators (default: None)
+
+    Attributes:
+        gram_cache (glow.utils.hsic_utils.GramCache): kernel matrices of the batch shared across layers and evaluators
+        sketches (glow.utils.quantile_sketch.ActivationSketches): streaming quantile sketches of the hidden layers
 
     """
 
-    def __init__(self, dynamics_segment):
+    def __init__(self, dynamics_segment, sketches=None):
         self.dynamics_segment = dynamics_segment
+        self.gram_cache = GramCache()
+        self.sketches = sketches
 
     def evaluate(self, evaluator_obj):
         """
@@ -27,9 +43,685 @@ class Dynamics:
             (iterable): evaluate dynamics segment with the criterion as defined in 'evaluator_obj'
 
         """
-        evaluated_segment = evaluator_obj.eval_dynamics_segment(self.dynamics_segment)
+        with ExitStack() as stack:
+            stack.enter_context(self.gram_cache)
+            if self.sketches is not None:
+                stack.enter_context(self.sketches)
+            evaluated_segment = evaluator_obj.eval_dynamics_segment(
+                self.dynamics_segment
+            )
         return evaluated_segment
 
+    def release(self):
+        """
+        Evicts all the cached kernel matrices of the batch, hit and miss
+        counters of `gram_cache` are kept.
+
+        """
+        self.gram_cache.clear()
+
+
+def to_tensor(evaluated_segment):
+    """
+    Converts (possibly nested) list of evaluated coordinates into a single
+    :class:`torch.Tensor`.
+
+    """
+    if isinstance(evaluated_segment, torch.Tensor):
+        return evaluated_segment.detach()
+    if isinstance(evaluated_segment, (list, tuple)):
+        return torch.stack([to_tensor(element) for element in evaluated_segment])
+    return torch.tensor(evaluated_segment)
+
+
+def expand(evaluated_dynamics):
+    """
+    Converts the evaluated dynamics of a batch (one entry per evaluator) into
+    a list of :class:`torch.Tensor` of shape (L, 2) on the CPU. Evaluators
+    which return coordinates for several settings at once, like
+    :class:`glow.information_bottleneck.MultiSigmaHSIC` with one set of
+    coordinates per bandwidth, are expanded into one entry per setting so
+    that the entries of all the evaluators can be stacked.
+
+    """
+    expanded = []
+    for evaluated_segment in evaluated_dynamics:
+        coordinates = to_tensor(evaluated_segment).cpu()
+        expanded.extend(coordinates.reshape((-1,) + coordinates.shape[-2:]))
+    return expanded
+
+
+class StreamingAccumulator:
+    """
+    Streaming block estimator which folds the evaluated dynamics segment of
+    every batch into running sums, giving an epoch-level (block) estimate of
+    the criterion along with its variance without keeping the per-batch
+    results.
+
+    Memory used is independent of the number of batches and linear in the
+    number of layers.
+
+    Attributes:
+        count (int): number of batches folded into the accumulator
+        mean (torch.Tensor): running mean of the coordinates over batches
+        m2 (torch.Tensor): running sum of squared deviations from the mean
+
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = None
+        self.m2 = None
+
+    def update(self, evaluated_segment):
+        """
+        Folds the coordinates of one batch into the running sums.
+
+        Arguments:
+            evaluated_segment (iterable): evaluated dynamics segment as returned by :meth:`glow.information_bottleneck.Estimator.eval_dynamics_segment`
+
+        """
+        value = to_tensor(evaluated_segment).double()
+        self.count += 1
+        if self.mean is None:
+            self.mean = torch.zeros_like(value)
+            self.m2 = torch.zeros_like(value)
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def estimate(self):
+        """
+        Returns:
+            (torch.Tensor): block estimate, that is average of the coordinates over all the batches seen
+
+        """
+        return self.mean
+
+    def variance(self):
+        """
+        Returns:
+            (torch.Tensor): variance of the block estimate, that is sample variance of the per-batch coordinates divided by the number of batches
+
+        """
+        if self.count < 2:
+            return torch.zeros_like(self.mean)
+        return self.m2 / ((self.count - 1) * self.count)
+
+
+class TrackingSchedule:
+    """
+    Decides which training batches have their dynamics tracked and evaluated,
+    so that the information plane can be sampled densely where it matters
+    without evaluating every batch.
+
+    Modes:
+        - 'every_k': every k-th global step
+        - 'log_spaced': about k steps per decade of global steps, that is dense early in the training and sparse later
+        - 'per_epoch': k evenly spaced batches in every epoch
+        - 'reservoir': uniform random sample of k batches in every epoch by reservoir sampling, a batch admitted to the reservoir is evaluated and may be evicted by a later one
+
+    Arguments:
+        mode (str): one of 'every_k', 'log_spaced', 'per_epoch' or 'reservoir'
+        k (int): period, steps per decade or number of batches per epoch depending on the mode
+        seed (int, optional): seed for the reservoir sampling (default: 0)
+
+    Attributes:
+        reservoir (iterable): global steps currently in the reservoir of the epoch, only for mode 'reservoir'
+
+    """
+
+    def __init__(self, mode, k, seed=0):
+        if mode not in ("every_k", "log_spaced", "per_epoch", "reservoir"):
+            raise ValueError("Could not interpret " "tracking schedule mode:", mode)
+        if k < 1:
+            raise ValueError("Tracking schedule requires k >= 1")
+        self.mode = mode
+        self.k = k
+        self.random = random.Random(seed)
+        self.start_epoch(0)
+
+    def start_epoch(self, num_batches):
+        """
+        Resets the per-epoch state, `num_batches` is the number of batches of
+        the epoch.
+
+        """
+        self.num_batches = num_batches
+        self.seen = 0
+        self.reservoir = []
+
+    def scheduled(self, step, batch):
+        """
+        Returns true if the batch with global step `step` and index `batch`
+        in its epoch has to be tracked.
+
+        """
+        if self.mode == "every_k":
+            return step % self.k == 0
+        if self.mode == "log_spaced":
+            if step == 0:
+                return True
+            return math.floor(self.k * math.log10(step + 1)) > math.floor(
+                self.k * math.log10(step)
+            )
+        if self.mode == "per_epoch":
+            if batch == 0:
+                return True
+            n = max(self.num_batches, 1)
+            return (batch * self.k) // n != ((batch - 1) * self.k) // n
+        self.seen += 1
+        if len(self.reservoir) < self.k:
+            self.reservoir.append(step)
+            return True
+        index = self.random.randrange(self.seen)
+        if index < self.k:
+            self.reservoir[index] = step
+            return True
+        return False
+
+    def kept(self, steps):
+        """
+        Filters the tracked global steps of an epoch down to the ones whose
+        results are kept, which drops the batches evicted from the reservoir.
+
+        """
+        if self.mode != "reservoir":
+            return list(steps)
+        reservoir = set(self.reservoir)
+        return [step for step in steps if step in reservoir]
+
+
+class ParallelEvaluator:
+    """
+    Runs all the evaluators on the same dynamics segment at once on a pool of
+    threads, the kernel matrices of the batch are still shared through the
+    Gram cache of the :class:`Dynamics` object.
+
+    While the evaluators run the intra-op threads of torch are split between
+    the workers, `torch.get_num_threads() // num_workers` each, so that the
+    workers do not oversubscribe the cores, and the thread count is restored
+    afterwards. Several threads can evaluate segments on the same pool at
+    once, the thread count is restored when the last of them returns.
+
+    Arguments:
+        num_workers (int): number of worker threads
+
+    """
+
+    def __init__(self, num_workers):
+        self.num_workers = num_workers
+        self.intra_op_threads = max(1, torch.get_num_threads() // num_workers)
+        self.executor = ThreadPoolExecutor(
+            num_workers,
+            initializer=torch.set_num_threads,
+            initargs=(self.intra_op_threads,),
+        )
+        self.lock = threading.Lock()
+        self.active = 0
+        self.num_threads = None
+
+    @staticmethod
+    def guarded(lock, dynamics_handler, evaluator):
+        with lock:
+            return dynamics_handler.evaluate(evaluator)
+
+    def evaluate(self, dynamics_handler, evaluators, locks=None):
+        """
+        Evaluates every evaluator on the segment of `dynamics_handler`.
+
+        Arguments:
+            dynamics_handler (Dynamics): dynamics of the batch
+            evaluators (iterable): list of :class:`glow.information_bottleneck.Estimator` instances
+            locks (iterable, optional): lock held while the corresponding evaluator runs (default: None)
+
+        Returns:
+            (iterable): evaluated dynamics segment for every evaluator in the order of `evaluators`
+
+        """
+        with self.lock:
+            if self.active == 0:
+                self.num_threads = torch.get_num_threads()
+                torch.set_num_threads(self.intra_op_threads)
+            self.active += 1
+        try:
+            if locks is None:
+                futures = [
+                    self.executor.submit(dynamics_handler.evaluate, evaluator)
+                    for evaluator in evaluators
+                ]
+            else:
+                futures = [
+                    self.executor.submit(
+                        self.guarded, lock, dynamics_handler, evaluator
+                    )
+                    for lock, evaluator in zip(locks, evaluators)
+                ]
+            return [future.result() for future in futures]
+        finally:
+            with self.lock:
+                self.active -= 1
+                if self.active == 0:
+                    torch.set_num_threads(self.num_threads)
+
+    def close(self):
+        self.executor.shutdown()
+
+
+class AsyncDynamics:
+    """
+    Evaluates the dynamics segments of the batches on a pool of background
+    threads while the training continues.
+
+    Segments are put on a bounded queue with :meth:`submit`, which blocks
+    when `max_pending` segments are waiting (backpressure) so the memory held
+    by pending segments stays bounded. Every evaluator is guarded by its own
+    lock so stateful evaluators are never run on two segments at once, while
+    different evaluators can run concurrently. :meth:`drain` waits for all
+    the submitted segments and returns their results in submission order.
+    Evaluators which read the activation sketches see them at evaluation
+    time, which may include batches submitted later. With `evaluator_workers`
+    greater than 1 the evaluators of a segment run at once on a
+    :class:`ParallelEvaluator` shared by the worker threads.
+
+    Arguments:
+        evaluators (iterable): list of :class:`glow.information_bottleneck.Estimator` instances
+        num_workers (int, optional): number of worker threads (default: 1)
+        max_pending (int, optional): maximum number of segments waiting in the queue (default: 8)
+        sketches (glow.utils.quantile_sketch.ActivationSketches, optional): streaming quantile sketches made available to the evaluators (default: None)
+        evaluator_workers (int, optional): number of threads running the evaluators of a segment at once (default: 1)
+
+    """
+
+    def __init__(
+        self,
+        evaluators,
+        num_workers=1,
+        max_pending=8,
+        sketches=None,
+        evaluator_workers=1,
+    ):
+        self.evaluators = list(evaluators)
+        self.sketches = sketches
+        self.locks = [threading.Lock() for _ in self.evaluators]
+        self.parallel_evaluator = None
+        if evaluator_workers > 1 and len(self.evaluators) > 1:
+            self.parallel_evaluator = ParallelEvaluator(evaluator_workers)
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.results = {}
+        self.error = None
+        self.submitted = 0
+        self.workers = [
+            threading.Thread(target=self.work, daemon=True) for _ in range(num_workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def work(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            index, dynamics_segment = item
+            try:
+                dynamics_handler = get(dynamics_segment, self.sketches)
+                if self.parallel_evaluator is not None:
+                    evaluated_dynamics = self.parallel_evaluator.evaluate(
+                        dynamics_handler, self.evaluators, self.locks
+                    )
+                else:
+                    evaluated_dynamics = []
+                    for lock, evaluator in zip(self.locks, self.evaluators):
+                        with lock:
+                            evaluated_dynamics.append(
+                                dynamics_handler.evaluate(evaluator)
+                            )
+                dynamics_handler.release()
+                self.results[index] = evaluated_dynamics
+            except Exception as error:
+                self.error = error
+            finally:
+                self.queue.task_done()
+
+    def submit(self, dynamics_segment):
+        """
+        Queues the dynamics segment of a batch for evaluation, blocks while
+        the queue is full.
+
+        """
+        self.queue.put((self.submitted, dynamics_segment))
+        self.submitted += 1
+
+    def drain(self):
+        """
+        Waits for all the submitted segments to be evaluated.
+
+        Returns:
+            (iterable): evaluated dynamics of every submitted segment (one entry per evaluator) in submission order
+
+        """
+        self.queue.join()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        results = [self.results[index] for index in range(self.submitted)]
+        self.results = {}
+        self.submitted = 0
+        return results
+
+    def close(self):
+        """
+        Stops the worker threads after the pending segments are evaluated.
+
+        """
+        for _ in self.workers:
+            self.queue.put(None)
+        for worker in self.workers:
+            worker.join()
+        if self.parallel_evaluator is not None:
+            self.parallel_evaluator.close()
+
+
+class DynamicsStore:
+    """
+    Append-only, chunked on-disk store of the evaluated dynamics (and
+    optionally the raw tracked activations) of a training run.
+
+    Arrays are buffered and written as float32 binary chunk files of about
+    `chunk_bytes` bytes (at the latest at the end of every epoch), every array
+    gets a record in the append-only index file with its run, epoch, global
+    step, evaluator, layer, chunk, offset and length. The coordinates of an
+    evaluator are split per layer (the second last dimension of the evaluated
+    segment), activations are stored per element of the dynamics segment
+    with evaluator -1 and layer 0 for the input. Reads go through
+    :class:`numpy.memmap` so a store can be analysed without loading it and
+    writing it keeps the memory constant over epochs.
+
+    A non-empty directory is only opened with `append=True`. Every training
+    run started with :meth:`start_run` gets the next run id, and its epochs
+    and steps continue the numbering of the runs already in the index so the
+    records of different runs never collide. The shape of the arrays of an
+    evaluator and layer is fixed by its first array.
+
+    Arguments:
+        path (str): directory of the store
+        chunk_bytes (int, optional): size in bytes after which the buffered arrays are written as a chunk (default: 64 MiB)
+        append (bool, optional): if true then an existing store in `path` is appended to (default: False)
+
+    """
+
+    COORDINATES = 0
+    ACTIVATIONS = 1
+    INDEX_DTYPE = np.dtype(
+        [
+            ("kind", np.int64),
+            ("run", np.int64),
+            ("epoch", np.int64),
+            ("step", np.int64),
+            ("evaluator", np.int64),
+            ("layer", np.int64),
+            ("chunk", np.int64),
+            ("offset", np.int64),
+            ("length", np.int64),
+        ]
+    )
+
+    def __init__(self, path, chunk_bytes=64 * 2 ** 20, append=False):
+        self.path = path
+        self.chunk_bytes = chunk_bytes
+        os.makedirs(path, exist_ok=True)
+        self.meta = {"num_chunks": 0, "shapes": {}}
+        if os.listdir(path):
+            if not append:
+                raise Exception(
+                    "Cannot open non-empty directory %s as dynamics store "
+                    "without append=True" % path
+                )
+            if not os.path.exists(self.meta_path()):
+                raise Exception("Cannot find dynamics store in %s" % path)
+            with open(self.meta_path()) as f:
+                self.meta = json.load(f)
+        self.chunk = self.meta["num_chunks"]
+        self.offset = 0
+        self.buffer = []
+        self.buffer_bytes = 0
+        self.pending = []  # index records of the current epoch
+        self.memmaps = {}
+        self.start_run()
+
+    def meta_path(self):
+        return os.path.join(self.path, "meta.json")
+
+    def index_path(self):
+        return os.path.join(self.path, "index.bin")
+
+    def chunk_path(self, chunk):
+        return os.path.join(self.path, "chunk_%06d.bin" % chunk)
+
+    def shape_key(self, kind, evaluator, layer):
+        return "%d/%d/%d" % (kind, evaluator, layer)
+
+    def start_run(self):
+        """
+        Starts a new run whose epochs and steps (counted from 0 by the
+        caller) are stored after the last epoch and step in the index. Has no
+        effect if nothing was written since the last call.
+
+        """
+        index = self.index()
+        if index.shape[0] == 0:
+            self.run, self.epoch_offset, self.step_offset = 0, 0, 0
+            return
+        self.run = int(index["run"].max()) + 1
+        self.epoch_offset = int(index["epoch"].max()) + 1
+        self.step_offset = int(index["step"].max()) + 1
+
+    def add(self, kind, epoch, step, evaluator, layer, array):
+        """
+        Buffers one array, its index record is written by :meth:`end_epoch`.
+
+        """
+        array = np.ascontiguousarray(array, dtype=np.float32)
+        key = self.shape_key(kind, evaluator, layer)
+        # the batch size of the activations may vary
+        shape = list(array.shape[1:] if kind == self.ACTIVATIONS else array.shape)
+        if self.meta["shapes"].setdefault(key, shape) != shape:
+            raise Exception(
+                "Cannot store array of shape %s for evaluator %d, layer %d "
+                "in a store holding shape %s"
+                % (shape, evaluator, layer, self.meta["shapes"][key])
+            )
+        self.pending.append(
+            (
+                kind,
+                self.run,
+                epoch + self.epoch_offset,
+                step + self.step_offset,
+                evaluator,
+                layer,
+                self.chunk,
+                self.offset,
+                array.size,
+            )
+        )
+        self.buffer.append(array.reshape(-1))
+        self.offset += array.size
+        self.buffer_bytes += array.nbytes
+        if self.buffer_bytes >= self.chunk_bytes:
+            self.flush_chunk()
+
+    def add_coordinates(self, epoch, step, evaluated_dynamics):
+        """
+        Buffers the evaluated dynamics of a batch (one entry per evaluator).
+
+        """
+        for evaluator, evaluated_segment in enumerate(evaluated_dynamics):
+            coordinates = to_tensor(evaluated_segment).cpu().numpy()
+            coordinates = np.moveaxis(coordinates, -2, 0)
+            for layer, layer_coordinates in enumerate(coordinates):
+                self.add(
+                    self.COORDINATES, epoch, step, evaluator, layer, layer_coordinates
+                )
+
+    def add_activations(self, epoch, step, dynamics_segment):
+        """
+        Buffers the raw tensors of the dynamics segment of a batch.
+
+        """
+        for layer, t in enumerate(dynamics_segment):
+            self.add(self.ACTIVATIONS, epoch, step, -1, layer, t.detach().cpu().numpy())
+
+    def write_meta(self):
+        with open(self.meta_path(), "w") as f:
+            json.dump(self.meta, f)
+
+    def flush_chunk(self):
+        if not self.buffer:
+            return
+        # every chunk is written at once, a file left behind by a run which
+        # stopped before writing its meta data holds no indexed records
+        with open(self.chunk_path(self.chunk), "wb") as f:
+            for array in self.buffer:
+                array.tofile(f)
+        self.chunk += 1
+        self.offset = 0
+        self.buffer = []
+        self.buffer_bytes = 0
+        self.meta["num_chunks"] = self.chunk
+        self.write_meta()
+
+    def end_epoch(self, kept_steps=None):
+        """
+        Writes the buffered arrays and appends the index records of the epoch,
+        records of steps (counted in the run) not in `kept_steps` (if given)
+        are dropped.
+
+        """
+        self.flush_chunk()
+        records = self.pending
+        if kept_steps is not None:
+            kept_steps = set(step + self.step_offset for step in kept_steps)
+            records = [r for r in records if r[3] in kept_steps]
+        with open(self.index_path(), "ab") as f:
+            np.array(records, dtype=self.INDEX_DTYPE).tofile(f)
+        self.write_meta()
+        self.pending = []
+
+    def index(self):
+        """
+        Returns:
+            (numpy.ndarray): memory mapped index records with fields kind, run, epoch, step, evaluator, layer, chunk, offset and length
+
+        """
+        if not os.path.exists(self.index_path()):
+            return np.zeros(0, dtype=self.INDEX_DTYPE)
+        if os.path.getsize(self.index_path()) == 0:
+            return np.zeros(0, dtype=self.INDEX_DTYPE)
+        return np.memmap(self.index_path(), dtype=self.INDEX_DTYPE, mode="r")
+
+    def read(self, record):
+        """
+        Memory mapped array of one index record.
+
+        """
+        chunk = int(record["chunk"])
+        if chunk not in self.memmaps.keys():
+            self.memmaps[chunk] = np.memmap(
+                self.chunk_path(chunk), dtype=np.float32, mode="r"
+            )
+        offset, length = int(record["offset"]), int(record["length"])
+        key = self.shape_key(
+            int(record["kind"]), int(record["evaluator"]), int(record["layer"])
+        )
+        shape = self.meta["shapes"][key]
+        array = self.memmaps[chunk][offset : offset + length]
+        if int(record["kind"]) == self.ACTIVATIONS:
+            return array.reshape([-1] + shape)
+        return array.reshape(shape)
+
+    def select(self, kind, evaluator, layer, epoch=None, run=None):
+        index = self.index()
+        mask = (
+            (index["kind"] == kind)
+            & (index["evaluator"] == evaluator)
+            & (index["layer"] == layer)
+        )
+        if epoch is not None:
+            mask &= index["epoch"] == epoch
+        if run is not None:
+            mask &= index["run"] == run
+        records = index[mask]
+        return np.array(records["step"]), [self.read(r) for r in records]
+
+    def coordinates(self, evaluator, layer, epoch=None, run=None):
+        """
+        Coordinates of a layer for one evaluator, optionally restricted to an
+        epoch and a run.
+
+        Returns:
+            (tuple): tuple containing:
+                (numpy.ndarray): global steps of the batches
+                (numpy.ndarray): coordinates of every batch stacked along the first dimension
+
+        """
+        steps, arrays = self.select(self.COORDINATES, evaluator, layer, epoch, run)
+        if not arrays:
+            return steps, np.zeros(0, dtype=np.float32)
+        return steps, np.stack(arrays)
+
+    def activations(self, layer, epoch=None, run=None):
+        """
+        Raw tracked tensors of an element of the dynamics segment (0 for the
+        input), optionally restricted to an epoch and a run.
+
+        Returns:
+            (tuple): tuple containing:
+                (numpy.ndarray): global steps of the batches
+                (iterable): memory mapped tensor of every batch
+
+        """
+        return self.select(self.ACTIVATIONS, -1, layer, epoch, run)
+
+
+def accumulate(model, evaluator_obj, data_loader):
+    """
+    Evaluates the dynamics of a model with dynamics tracking over all the
+    batches of a data loader and folds them into a
+    :class:`StreamingAccumulator`. The model is run in evaluation mode (no
+    dropout and no update of its activation sketches) and its previous mode
+    is restored afterwards.
+
+    Arguments:
+        model (glow.models.Network): model whose forward pass returns the tracked hidden outputs
+        evaluator_obj (glow.information_bottleneck.Estimator): object that defines `criterion` method using which we obtain coordinates
+        data_loader (torch.utils.data.DataLoader): dataset (with already processed batches)
+
+    Returns:
+        (StreamingAccumulator): accumulator holding the block estimate over the whole data loader
+
+    """
+    if not model.track_dynamics:
+        raise Exception("Cannot accumulate dynamics for track_dynamics=False")
+    accumulator = StreamingAccumulator()
+    training = model.training
+    model.eval()
+    try:
+        with torch.no_grad():
+            for x, y in data_loader:
+                x = x.to(model.device)
+                _, hidden_outputs = model.forward(x)
+                sketches = getattr(model, "activation_sketches", None)
+                dynamics_handler = get([x] + hidden_outputs, sketches)
+                accumulator.update(dynamics_handler.evaluate(evaluator_obj))
+                dynamics_handler.release()
+    finally:
+        model.train(training)
+    return accumulator
+
 
-def get(identifier):
-    return Dynamics(identifier)
+def get(identifier, sketches=None):
+    return Dynamics(identifier, sketches)
@@ -5,23 +5,424 @@ def floor_hash(x, epsilon, b):
     return torch.floor((1 / epsilon) * (x + b))
 
 
+def pack_codes(codes):
+    """
+    Packs integer hash codes of shape (m, k) (or any shape with samples along
+    the first dimension) into a single int64 bucket id per sample without
+    collisions.
+
+    Codes are shifted to start from zero and combined with mixed radix given
+    by the range of every dimension. Whenever the combined range would not
+    fit into int64 the ids packed so far are first enumerated with
+    :func:`enumerate_buckets`, which bounds their range by m.
+
+
+    Arguments:
+        codes (torch.Tensor): hash codes of the samples
+
+    Returns:
+        (torch.Tensor): int64 bucket ids of shape (m,)
+
+    """
+    m = codes.shape[0]
+    codes = codes.reshape(m, -1).long()
+    codes = codes - codes.min(dim=0).values
+    radix = (codes.max(dim=0).values + 1).tolist()
+    groups = (
+        (torch.sum(codes[:, start:stop] * strides.to(codes.device), dim=1), span)
+        for start, stop, span, strides in radix_groups(radix)
+    )
+    return combine_groups(groups, enumerate_buckets)
+
+
+def radix_groups(radix):
+    """
+    Splits the dimensions with ranges `radix` into consecutive groups whose
+    combined mixed radix range fits into int64.
+
+    Returns:
+        (iterable): start and stop of the dimensions, combined range and int64 strides of the dimensions of every group
+
+    """
+    groups = []
+    start, span = 0, 1
+    for k, r in enumerate(radix):
+        if span * r >= 2 ** 63:
+            groups.append((start, k, span))
+            start, span = k, 1
+        span *= r
+    groups.append((start, len(radix), span))
+    for idx, (start, stop, span) in enumerate(groups):
+        strides = [1]
+        for r in radix[start : stop - 1]:
+            strides.append(strides[-1] * r)
+        groups[idx] = (start, stop, span, torch.tensor(strides))
+    return groups
+
+
+def combine_groups(groups, enumerate_ids):
+    """
+    Combines the ids of every group, given as pairs of ids and their range,
+    into a single int64 id without collisions. Whenever the combined range
+    would not fit into int64 the ids are first enumerated with
+    `enumerate_ids` (:func:`enumerate_buckets` or :func:`enumerate_rows`),
+    which bounds their range by the number of ids.
+
+    """
+    ids, ids_span = None, 1
+    for group_ids, span in groups:
+        if ids is None:
+            ids, ids_span = group_ids, span
+            continue
+        if ids_span * span >= 2 ** 63:
+            ids, counts = enumerate_ids(ids)
+            ids_span = counts.shape[0]
+        if ids_span * span >= 2 ** 63:
+            group_ids, counts = enumerate_ids(group_ids)
+            span = counts.shape[0]
+        ids = ids * span + group_ids
+        ids_span *= span
+    return ids
+
+
+def floor_increments(x, epsilon, offsets):
+    """
+    With `u = x / epsilon` and `beta = b / epsilon` in [0, 1) the code
+    `floor(u + beta)` of :func:`floor_hash` is the base code `floor(u)` plus
+    one in the dimensions whose threshold `1 - (u - floor(u))` is at most
+    `beta`, so the offset from which a dimension is incremented is found by
+    binary search in the sorted offsets.
+
+    Returns:
+        (tuple): tuple containing:
+            (torch.Tensor): base codes of shape (m, d) shifted to start from zero
+            (torch.Tensor): rank in the sorted offsets from which every dimension is incremented, K if never
+            (torch.Tensor): sorted offsets
+            (torch.Tensor): indices of the sorted offsets in `offsets`
+
+    """
+    m = x.shape[0]
+    u = (1 / epsilon) * x.reshape(m, -1).double()
+    base = torch.floor(u)
+    betas, rank = torch.sort(((1 / epsilon) * offsets.double()).to(u.device))
+    slots = torch.searchsorted(betas, (1 - (u - base)).contiguous())
+    base = base.long()
+    return base - base.min(dim=0).values, slots, betas, rank
+
+
+def ensemble_floor_hash(x, epsilon, offsets):
+    """
+    Packed :func:`floor_hash` bucket ids of the samples `x` for every offset
+    in `offsets`, equal to :func:`pack_codes` of `floor_hash(x, epsilon, b)`
+    for every offset `b` up to a relabelling of the ids.
+
+    The base codes are packed once, see :func:`floor_increments`, and the
+    increments of all the offsets are a cumulative sum of the strides over
+    the ranks. This costs O(m d log K + m K) instead of the O(m d K) of
+    hashing every offset, the ids themselves are still O(m K).
+
+
+    Arguments:
+        x (torch.Tensor): samples of shape (m, ...)
+        epsilon (float): width of the buckets
+        offsets (torch.Tensor): offsets of shape (K,) with values in [0, epsilon)
+
+    Returns:
+        (torch.Tensor): int64 bucket ids of shape (K, m), ids are only comparable within an offset
+
+    """
+    m = x.shape[0]
+    K = offsets.shape[0]
+    base, slots, _, rank = floor_increments(x, epsilon, offsets)
+    # one more value per dimension for the increments
+    radix = (base.max(dim=0).values + 2).tolist()
+
+    def group_ids(start, stop, strides):
+        strides = strides.to(base.device)
+        ids = torch.sum(base[:, start:stop] * strides, dim=1)
+        increments = base.new_zeros(m, K + 1).scatter_add_(
+            1, slots[:, start:stop], strides.expand(m, stop - start)
+        )
+        increments = torch.cumsum(increments[:, :K], dim=1)[:, torch.argsort(rank)]
+        return (ids.unsqueeze(1) + increments).t()
+
+    # ids only need to be consistent within an offset
+    groups = (
+        (group_ids(start, stop, strides), span)
+        for start, stop, span, strides in radix_groups(radix)
+    )
+    return combine_groups(groups, enumerate_rows)
+
+
+def floor_hash_states(x, epsilon, offsets):
+    """
+    :func:`floor_hash` bucket ids of the samples `x` for all the offsets in
+    `offsets` as a sequence of states per sample. Over the sorted offsets
+    the code of a sample only changes at the ranks from which one of its
+    dimensions is incremented (see :func:`floor_increments`), so a sample
+    has at most `min(d, K) + 1` states. The codes of the states are packed
+    and enumerated together, which costs O(m d log d) plus the enumeration
+    of O(m min(d, K)) ids, independent of K otherwise.
+
+
+    Arguments:
+        x (torch.Tensor): samples of shape (m, ...)
+        epsilon (float): width of the buckets
+        offsets (torch.Tensor): offsets of shape (K,) with values in [0, epsilon)
+
+    Returns:
+        (tuple): tuple containing:
+            (torch.Tensor): sample of every state, states are ordered by sample and rank
+            (torch.Tensor): rank in the sorted offsets from which the state holds, until the next state of the sample
+            (torch.Tensor): consecutive bucket ids of the states, comparable across offsets
+            (torch.Tensor): indices of the sorted offsets in `offsets`
+
+    """
+    m = x.shape[0]
+    K = offsets.shape[0]
+    base, slots, _, rank = floor_increments(x, epsilon, offsets)
+    radix = (base.max(dim=0).values + 2).tolist()
+    # the increments of a sample are applied in the order of their ranks
+    slots, dims = torch.sort(slots, dim=1)
+    starts = torch.cat([slots.new_zeros(m, 1), slots], dim=1)
+    # a state is superseded by a state starting at the same rank
+    keep = torch.ones_like(starts, dtype=torch.bool)
+    keep[:, :-1] = starts[:, 1:] != starts[:, :-1]
+    keep &= starts < K
+
+    def group_ids(start, stop, strides):
+        strides = strides.to(base.device)
+        ids = torch.sum(base[:, start:stop] * strides, dim=1, keepdim=True)
+        dim_strides = base.new_zeros(base.shape[1])
+        dim_strides[start:stop] = strides
+        increments = torch.cumsum(dim_strides[dims], dim=1)
+        return torch.cat([ids, ids + increments], dim=1)[keep]
+
+    columns = [
+        group_ids(start, stop, strides)
+        for start, stop, _, strides in radix_groups(radix)
+    ]
+    ids = enumerate_columns(columns)
+    samples = torch.arange(m, device=base.device).unsqueeze(1).expand_as(starts)
+    return samples[keep], starts[keep], ids, rank
+
+
+def enumerate_buckets(ids):
+    """
+    Maps int64 bucket ids of shape (m,) to consecutive integers in
+    [0, num_buckets). When the range of the ids is small this is done with
+    `bincount` in linear time, otherwise with `torch.unique`.
+
+
+    Arguments:
+        ids (torch.Tensor): int64 bucket ids
+
+    Returns:
+        (tuple): tuple containing:
+            (torch.Tensor): consecutive bucket ids of shape (m,)
+            (torch.Tensor): number of samples in each bucket
+
+    """
+    low = ids.min()
+    span = int(ids.max() - low) + 1
+    if span <= 4 * ids.shape[0]:
+        ids = ids - low
+        counts = torch.bincount(ids, minlength=span)
+        present = counts > 0
+        dense = torch.cumsum(present, dim=0) - 1
+        return dense[ids], counts[present]
+    _, ids, counts = torch.unique(ids, return_inverse=True, return_counts=True)
+    return ids, counts
+
+
+def enumerate_columns(columns):
+    """
+    Enumerates the tuples formed by the int64 ids of the same position in
+    every tensor of `columns` with one stable sort per column, which is
+    cheaper than combining the columns with :func:`combine_groups` when
+    that would have to enumerate the ids repeatedly.
+
+
+    Arguments:
+        columns (iterable): int64 ids of shape (n,) for every column
+
+    Returns:
+        (torch.Tensor): consecutive ids of shape (n,), equal for equal tuples
+
+    """
+    order = None
+    for column in reversed(columns):
+        if order is None:
+            order = torch.sort(column, stable=True)[1]
+        else:
+            order = order[torch.sort(column[order], stable=True)[1]]
+    first = torch.zeros_like(order, dtype=torch.bool)
+    first[0] = True
+    for column in columns:
+        column = column[order]
+        first[1:] |= column[1:] != column[:-1]
+    dense = torch.cumsum(first, dim=0) - 1
+    return torch.empty_like(dense).scatter_(0, order, dense)
+
+
+def enumerate_rows(ids):
+    """
+    Enumerates the int64 bucket ids of every row of `ids` separately with a
+    single batched sort along the rows, which is cheaper than enumerating
+    all the rows at once. The buckets of a row get consecutive ids following
+    the buckets of the previous row, so rows never share buckets.
+
+
+    Arguments:
+        ids (torch.Tensor): int64 bucket ids of shape (K, m)
+
+    Returns:
+        (tuple): tuple containing:
+            (torch.Tensor): consecutive bucket ids of shape (K, m)
+            (torch.Tensor): number of samples in each bucket
+
+    """
+    K, m = ids.shape
+    sorted_ids, order = torch.sort(ids, dim=1)
+    first = torch.ones_like(sorted_ids, dtype=torch.bool)
+    first[:, 1:] = sorted_ids[:, 1:] != sorted_ids[:, :-1]
+    dense = torch.cumsum(first.reshape(-1), dim=0).reshape(K, m) - 1
+    counts = torch.bincount(dense.reshape(-1))
+    return torch.empty_like(dense).scatter_(1, order, dense), counts
+
+
+class _RandomProjection:
+    # random projection matrices are drawn lazily for every input dimension
+    def __init__(self, num_projections, seed):
+        self.num_projections = num_projections
+        self.seed = seed
+        self.projections = {}
+
+    def projection(self, x):
+        key = (x.shape[1], x.dtype, x.device)
+        if key not in self.projections.keys():
+            generator = torch.Generator().manual_seed(self.seed)
+            A = torch.randn(x.shape[1], self.num_projections, generator=generator)
+            b = torch.rand(self.num_projections, generator=generator)
+            self.projections[key] = (A.to(x.device, x.dtype), b.to(x.device, x.dtype))
+        return self.projections[key]
+
+
+class PStableHash(_RandomProjection):
+    """
+    Random projection locality sensitive hash for euclidean distance as
+    proposed in the paper "Locality-Sensitive Hashing Scheme Based on
+    p-Stable Distributions", `h(x) = floor((x a + b) / epsilon)` for
+    `num_projections` gaussian directions `a` and offsets `b` in [0, epsilon).
+
+
+    Arguments:
+        num_projections (int): number of random projections per sample
+        epsilon (float): width of the buckets along every projection
+        seed (int, optional): seed for drawing the projections (default: 0)
+
+    """
+
+    def __init__(self, num_projections, epsilon, seed=0):
+        super().__init__(num_projections, seed)
+        self.epsilon = epsilon
+
+    def __call__(self, x):
+        m = x.shape[0]
+        x = x.reshape(m, -1)
+        if not x.is_floating_point():
+            x = x.float()
+        A, b = self.projection(x)
+        return pack_codes(torch.floor(torch.mm(x, A) / self.epsilon + b))
+
+
+class SignHash(_RandomProjection):
+    """
+    Sign random projection locality sensitive hash for angular distance
+    (SimHash), every sample is mapped to the bit pattern of the signs of its
+    `num_projections` random projections.
+
+
+    Arguments:
+        num_projections (int): number of random projections (bits) per sample, at most 63
+        seed (int, optional): seed for drawing the projections (default: 0)
+
+    """
+
+    def __init__(self, num_projections, seed=0):
+        if num_projections > 63:
+            raise Exception("sign_hash supports at most 63 projections")
+        super().__init__(num_projections, seed)
+
+    def __call__(self, x):
+        m = x.shape[0]
+        x = x.reshape(m, -1)
+        if not x.is_floating_point():
+            x = x.float()
+        A, _ = self.projection(x)
+        bits = (torch.mm(x, A) > 0).long()
+        weights = 2 ** torch.arange(self.num_projections, device=x.device)
+        return torch.sum(bits * weights, dim=1)
+
+
+class MultiTableHash:
+    """
+    Multi-table locality sensitive hash which concatenates the bucket ids of
+    `num_tables` independent :class:`PStableHash` tables.
+
+
+    Arguments:
+        num_tables (int): number of hash tables
+        num_projections (int): number of random projections per table
+        epsilon (float): width of the buckets along every projection
+        seed (int, optional): seed for drawing the projections, table `t` uses `seed + t` (default: 0)
+
+    """
+
+    def __init__(self, num_tables, num_projections, epsilon, seed=0):
+        self.tables = [
+            PStableHash(num_projections, epsilon, seed + t) for t in range(num_tables)
+        ]
+
+    def __call__(self, x):
+        return torch.stack([table(x) for table in self.tables], dim=1)
+
+
+def _get_param(params_dict, name, identifier):
+    if name in params_dict.keys():
+        return params_dict[name]
+    else:
+        raise Exception(
+            "Cannot find argument " + name + " for hash function " + identifier
+        )
+
+
 def get(identifier, params_dict):
     if identifier == "floor_hash":
+        epsilon = _get_param(params_dict, "epsilon", identifier)
+        b = _get_param(params_dict, "b", identifier)
 
         def curry_func(x):
-            if "epsilon" in params_dict.keys():
-                epsilon = params_dict["epsilon"]
-            else:
-                raise Exception(
-                    "Cannot find argument epsilon for hash function floor_hash"
-                )
-
-            if "b" in params_dict.keys():
-                b = params_dict["b"]
-            else:
-                raise Exception("Cannot find argument b for hash function floor_hash")
             return floor_hash(x, epsilon, b)
 
         return curry_func
+    elif identifier == "p_stable_hash":
+        return PStableHash(
+            _get_param(params_dict, "num_projections", identifier),
+            _get_param(params_dict, "epsilon", identifier),
+            params_dict.get("seed", 0),
+        )
+    elif identifier == "sign_hash":
+        return SignHash(
+            _get_param(params_dict, "num_projections", identifier),
+            params_dict.get("seed", 0),
+        )
+    elif identifier == "multi_table_hash":
+        return MultiTableHash(
+            _get_param(params_dict, "num_tables", identifier),
+            _get_param(params_dict, "num_projections", identifier),
+            _get_param(params_dict, "epsilon", identifier),
+            params_dict.get("seed", 0),
+        )
     else:
         raise ValueError("Could not interpret " "hash function identifier:", identifier)
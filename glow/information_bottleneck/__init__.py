@@ -1,4 +1,14 @@
-# from .estimator import EDGE
-# from .estimator import Binned
+from .estimator import EDGE
+from .estimator import Binned
+from .estimator import KDE
+from .estimator import KNN
+from .estimator import KSG
+from .estimator import MINE
+from .estimator import InfoNCE
+from .estimator import SlicedMI
 from .estimator import HSIC
+from .estimator import RandomFeatureHSIC
+from .estimator import NystromHSIC
+from .estimator import MultiSigmaHSIC
+from .estimator import MatrixRenyi
 from .estimator import Estimator
@@ -2,7 +2,9 @@ import random
 import glow.hash_functions as hash_module
 import math
 import torch
+from torch import nn
 import glow.utils.hsic_utils as kernel_module
+import glow.utils.quantile_sketch as quantile_sketch
 
 
 class Estimator:
@@ -76,27 +78,1220 @@ class Estimator:
         return output_segment
 
 
-"""
-class Binned(_Estimator):
-    # TODO
+class Binned(Estimator):
+    """
+    Mutual information estimated by discretizing the activations into bins
+    as done in the paper "Opening the Black Box of Deep Neural Networks via
+    Information".
+
+    Every sample's binned pattern is packed into a single integer key and
+    the entropies are obtained from the counts of the keys, so there are no
+    python loops over samples or neurons. Mutual information is measured in
+    bits as `H(X) + H(Y) - H(X, Y)`, integer valued variables (class labels)
+    are used without binning.
+
+
+    Arguments:
+        num_bins (int, optional): number of bins per neuron (default: 30)
+        binning (str, optional): 'uniform' for equal width bins spanning the range of the whole layer or 'adaptive' for equal mass bins from per-neuron quantiles, the quantiles are read from the active :class:`glow.utils.quantile_sketch.ActivationSketches` when available else from the batch (default: 'uniform')
+        gpu (bool, optional): if true then all the computation is carried on `GPU` else on `CPU`
+        **kwargs: the keyword that stores parameters for the estimator
+
+    """
+
+    def __init__(self, num_bins=30, binning="uniform", gpu=True, **kwargs):
+        super().__init__(gpu, **kwargs)
+        if binning not in ("uniform", "adaptive"):
+            raise ValueError("Could not interpret " "binning identifier:", binning)
+        self.num_bins = num_bins
+        self.binning = binning
+
+    def bin_edges(self, t):
+        """
+        Per-neuron bin edges of shape (num_bins + 1, d) for the samples `t` of
+        shape (m, d).
+
+        """
+        m, d = t.shape
+        if self.binning == "uniform":
+            edges = torch.linspace(0, 1, self.num_bins + 1, device=t.device)
+            edges = t.min() + (t.max() - t.min()) * edges
+            return edges.unsqueeze(1).expand(-1, d)
+        quantiles = torch.linspace(0, 1, self.num_bins + 1, device=t.device)
+        index = torch.round(quantiles * (m - 1)).long()
+        # sorting contiguous rows is much faster than sorting along dim 0
+        return torch.sort(t.t().contiguous(), dim=1).values[:, index].t()
+
+    def discretize(self, t, edges=None):
+        """
+        Bin index in [0, num_bins) of every activation of `t` of shape (m, d),
+        bin edges are obtained with :meth:`bin_edges` if not given.
+
+        """
+        if edges is None and self.binning == "uniform":
+            low, high = t.min(), t.max()
+            width = torch.clamp((high - low) / self.num_bins, min=1e-12)
+            codes = torch.floor((t - low) / width)
+            return torch.clamp(codes, 0, self.num_bins - 1).long()
+        if edges is None:
+            edges = self.bin_edges(t)
+        inner_edges = edges[1:-1].t().contiguous().to(t)
+        codes = torch.searchsorted(inner_edges, t.t().contiguous(), right=True)
+        return codes.t()
+
+    def bucket_ids(self, t, edges=None):
+        """
+        Maps every sample of `t` to the id of its binned pattern.
+
+        Returns:
+            (tuple): tuple containing:
+                (torch.Tensor): consecutive pattern ids of shape (m,)
+                (torch.Tensor): number of samples with each pattern
+
+        """
+        m = t.shape[0]
+        t = t.to(self.device).reshape(m, -1)
+        if t.is_floating_point():
+            t = self.discretize(t, edges)
+        return hash_module.enumerate_buckets(hash_module.pack_codes(t))
+
+    def entropy(self, counts):
+        p = counts.double() / torch.sum(counts)
+        return -torch.sum(p * torch.log2(p))
+
+    def mutual_information(self, x_buckets, y_buckets):
+        """
+        Mutual information from the pattern ids and counts of two variables
+        as returned by :meth:`bucket_ids`.
+
+        """
+        i, N = x_buckets
+        j, M = y_buckets
+        _, L = hash_module.enumerate_buckets(i * M.shape[0] + j)
+        mut_info = self.entropy(N) + self.entropy(M) - self.entropy(L)
+        return mut_info.float()
+
+    def criterion(self, x, y):
+        """
+        Defines the binning estimate of mutual information.
+
+        """
+        return self.mutual_information(self.bucket_ids(x), self.bucket_ids(y))
+
+    def eval_dynamics_segment(self, dynamics_segment):
+        """
+        Process smallest segment of dynamics and calculate coordinates, the
+        input and label are binned only once for all the layers. For adaptive
+        binning the bin edges of the hidden layers come from the active
+        activation sketches if there are any.
+
+
+        Arguments:
+            dynamics_segment (iterable): smallest segment of the dynamics of a batch containing input, hidden layer output and label in form of :class:`torch.Tensor` objects
+
+        Returns:
+            (iterable): list of calculated coordinates according to the criterion with length equal to 'len(dynamics_segment)-2'
+
+        """
+        segment_size = len(dynamics_segment)
+        sketches = None
+        if self.binning == "adaptive":
+            sketches = quantile_sketch.active_sketches()
+
+        def buckets(idx):
+            edges = None
+            # the input is not a hidden layer and has no sketch
+            if sketches is not None and idx > 0:
+                edges = sketches.bin_edges(idx - 1, self.num_bins)
+            return self.bucket_ids(dynamics_segment[idx], edges)
+
+        x_buckets = buckets(0)
+        y_buckets = buckets(segment_size - 1)
+        output_segment = []
+        for idx in range(1, segment_size - 1):
+            h_buckets = buckets(idx)
+            output_segment.append(
+                [
+                    self.mutual_information(h_buckets, x_buckets),
+                    self.mutual_information(h_buckets, y_buckets),
+                ]
+            )
+        return output_segment
+
+
+class KDE(Estimator):
+    """
+    Upper bound on mutual information from a gaussian kernel density
+    estimate of the activations with additive noise of variance
+    `noise_variance`, as proposed in the paper "Estimating Mixture Entropy
+    with Pairwise Distances" (Kolchinsky & Tracey) and used in "On the
+    Information Bottleneck Theory of Deep Learning".
+
+    Since the hidden layer is a deterministic function of the input the
+    bound reduces to `I(T; X) = log(m) - mean_i log sum_j exp(-|t_i - t_j|^2 / (2 noise_variance))`,
+    and `I(T; Y)` compares the same log-sums with the ones restricted to the
+    samples of the class of `t_i`. The pairwise log-densities are computed in
+    tiles of `tile_size` rows with log-sum-exp so that memory is
+    O(m * tile_size), and all the classes are handled in the same pass by
+    masking. Mutual information is measured in bits.
+
+    Integer valued targets are used as class labels, floating point targets
+    with one column per class (for example the output of the network) are
+    converted to labels with argmax.
+
+
+    Arguments:
+        noise_variance (float, optional): variance of the gaussian noise added to the activations (default: 0.1)
+        tile_size (int, optional): number of rows of the pairwise distance matrix computed at once (default: 1024)
+        gpu (bool): if true then all the computation is carried on `GPU` else on `CPU`
+        dtype (torch.dtype, optional): floating point precision of the computation (default: torch.float32)
+        **kwargs: the keyword that stores parameters for the estimator
+
+    """
+
+    def __init__(
+        self,
+        noise_variance=0.1,
+        tile_size=1024,
+        gpu=True,
+        dtype=torch.float32,
+        **kwargs
+    ):
+        super().__init__(gpu, **kwargs)
+        self.noise_variance = noise_variance
+        self.tile_size = tile_size
+        self.dtype = dtype
+
+    def labels(self, y):
+        m = y.shape[0]
+        y = y.to(self.device).reshape(m, -1)
+        if y.is_floating_point():
+            y = torch.argmax(y, dim=1)
+        else:
+            y = y[:, 0]
+        _, labels, counts = torch.unique(y, return_inverse=True, return_counts=True)
+        return labels, counts
+
+    def log_sums(self, t, labels=None):
+        """
+        Log-sum-exp of the scaled negative squared distances of every sample
+        of `t` to all the samples and, if `labels` are given, to the samples
+        of its own class.
+
+        Returns:
+            (tuple): tuple containing:
+                (torch.Tensor): log-sums over all the samples of shape (m,)
+                (torch.Tensor): log-sums over the samples of the same class of shape (m,) or None
+
+        """
+        m = t.shape[0]
+        scale = -1 / (2 * self.noise_variance)
+        log_sums, class_log_sums = [], []
+        for start in range(0, m, self.tile_size):
+            stop = min(start + self.tile_size, m)
+            L = kernel_module.squared_distances(t[start:stop], t)
+            L.mul_(scale)
+            log_sums.append(torch.logsumexp(L, dim=1))
+            if labels is not None:
+                other = labels[start:stop].unsqueeze(1) != labels.unsqueeze(0)
+                L.masked_fill_(other, -math.inf)
+                class_log_sums.append(torch.logsumexp(L, dim=1))
+        if labels is None:
+            return torch.cat(log_sums), None
+        return torch.cat(log_sums), torch.cat(class_log_sums)
+
+    def coordinates(self, t, y=None):
+        """
+        Information plane coordinates `I(T; X)` and `I(T; Y)` of the layer
+        output `t`, `I(T; Y)` is None if `y` is not given.
+
+        """
+        m = t.shape[0]
+        t = t.to(self.device, self.dtype).reshape(m, -1)
+        if y is None:
+            log_sums, _ = self.log_sums(t)
+            mut_info_y = None
+        else:
+            labels, counts = self.labels(y)
+            log_sums, class_log_sums = self.log_sums(t, labels)
+            class_log_sums = class_log_sums - torch.log(counts.to(t))[labels]
+            mut_info_y = torch.mean(class_log_sums - log_sums) + math.log(m)
+            mut_info_y = mut_info_y / math.log(2)
+        mut_info_x = (math.log(m) - torch.mean(log_sums)) / math.log(2)
+        return mut_info_x, mut_info_y
+
+    def criterion(self, x, y):
+        """
+        Defines the KDE upper bound on mutual information between the layer
+        output `x` and the labels `y` if `y` is integer valued, else between
+        `x` and the input `y` it is computed from.
+
+        """
+        if y.is_floating_point():
+            return self.coordinates(x)[0]
+        return self.coordinates(x, y)[1]
+
+    def eval_dynamics_segment(self, dynamics_segment):
+        """
+        Process smallest segment of dynamics and calculate coordinates, both
+        coordinates of a layer are obtained from the same tiled pass.
+
+
+        Arguments:
+            dynamics_segment (iterable): smallest segment of the dynamics of a batch containing input, hidden layer output and label in form of :class:`torch.Tensor` objects
+
+        Returns:
+            (iterable): list of calculated coordinates according to the criterion with length equal to 'len(dynamics_segment)-2'
+
+        """
+        segment_size = len(dynamics_segment)
+        y = dynamics_segment[segment_size - 1]
+        output_segment = []
+        for idx in range(1, segment_size - 1):
+            output_segment.append(list(self.coordinates(dynamics_segment[idx], y)))
+        return output_segment
+
+
+class KNN(Estimator):
+    """
+    Mutual information from the k-nearest neighbour entropy estimator of
+    Kozachenko & Leonenko as `H(X) + H(Y) - H(X, Y)`, the joint distance is
+    the euclidean distance of the concatenated samples. For integer valued
+    targets (class labels) it is `H(X) - sum_c p_c H(X | c)` with the
+    conditional entropies computed from the neighbours within the class.
+
+    Neighbours are searched exactly in tiles of `tile_size` query rows, the
+    distances of one tile to all the samples are computed with the Gram
+    trick of :mod:`glow.utils.hsic_utils` and reduced with top-k so that
+    memory is O(m * tile_size). The Gram trick loses precision for close
+    samples, therefore the radii of the selected neighbours are recomputed
+    exactly from the differences of the samples. Duplicated samples, whose
+    radius is zero, are left out of the average. For large sets `num_queries` samples can be
+    drawn as queries which keeps the search exact but averages the estimate
+    over fewer samples, making the cost linear in m. Mutual information is
+    measured in bits.
+
+
+    Arguments:
+        k (int, optional): number of nearest neighbours (default: 3)
+        tile_size (int, optional): number of query rows searched at once (default: 1024)
+        num_queries (int, optional): number of randomly drawn query samples for the approximate mode, all the samples are queries if None (default: None)
+        seed (int, optional): seed for drawing the query samples (default: 0)
+        gpu (bool): if true then all the computation is carried on `GPU` else on `CPU`
+        dtype (torch.dtype, optional): floating point precision of the distances (default: torch.float32)
+        **kwargs: the keyword that stores parameters for the estimator
+
+    """
+
+    def __init__(
+        self,
+        k=3,
+        tile_size=1024,
+        num_queries=None,
+        seed=0,
+        gpu=True,
+        dtype=torch.float32,
+        **kwargs
+    ):
+        super().__init__(gpu, **kwargs)
+        self.k = k
+        self.tile_size = tile_size
+        self.num_queries = num_queries
+        self.seed = seed
+        self.dtype = dtype
+
+    def prepare(self, t):
+        m = t.shape[0]
+        if not t.is_floating_point():
+            return t.to(self.device).reshape(m, -1)[:, 0]
+        return t.to(self.device, self.dtype).reshape(m, -1)
+
+    def queries(self, m):
+        """
+        Indices of the query samples, drawn without replacement with `seed`
+        in the approximate mode.
+
+        """
+        if self.num_queries is None or self.num_queries >= m:
+            return torch.arange(m, device=self.device)
+        generator = torch.Generator().manual_seed(self.seed)
+        index = torch.randperm(m, generator=generator)[: self.num_queries]
+        return index.to(self.device)
+
+    def tiles(self, m):
+        """
+        Yields the query indices in tiles of `tile_size`.
+
+        """
+        index = self.queries(m)
+        for start in range(0, index.shape[0], self.tile_size):
+            yield index[start : start + self.tile_size]
+
+    def squared_distances(self, t, rows):
+        """
+        Squared euclidean distances of shape (len(rows), m) between the
+        samples `t[rows]` and all the samples computed with the Gram trick,
+        the distance of a sample to itself is set to infinity.
+
+        Returns:
+            (tuple): tuple containing:
+                (torch.Tensor): squared distances
+                (torch.Tensor): per-row bound of shape (len(rows), 1) on the rounding error of the squared distances, the Gram trick loses precision to cancellation for close samples
+
+        """
+        D = kernel_module.squared_distances(t[rows], t)
+        norms = torch.sum(t * t, dim=1)
+        eps = torch.finfo(t.dtype).eps
+        tolerance = (2 * (t.shape[1] + 2) * eps) * (norms[rows] + torch.max(norms))
+        tolerance = tolerance.unsqueeze(1)
+        return D.scatter_(1, rows.unsqueeze(1), math.inf), tolerance
+
+    def pair_distances(self, t, row_index, col_index):
+        """
+        Exact squared distances between the samples `t[row_index]` and
+        `t[col_index]` computed from their differences.
 
+        """
+        return torch.sum((t[row_index] - t[col_index]) ** 2, dim=-1)
+
+    def exact_distances(self, parts, row_index, col_index, combine):
+        distances = None
+        for t in parts:
+            D = self.pair_distances(t, row_index, col_index)
+            distances = D if distances is None else combine(distances, D)
+        return distances
+
+    def nearest(self, parts, rows, D, tolerance, k, combine=torch.add):
+        """
+        Exact squared distances of shape (len(rows), k) of the samples `rows`
+        to their k nearest neighbours in ascending order, in the joint space
+        of `parts` whose squared distances are combined by `combine`.
+
+        The 2k nearest candidates are selected with the approximate squared
+        distances `D` (infinite for pairs which are not neighbours) and their
+        distances are recomputed exactly. Rows in which a sample outside of
+        the candidates could be closer than the k-th candidate, given the
+        error bound `tolerance` of `D`, are searched exactly over all the
+        samples.
+
+        """
+        m = D.shape[1]
+        approx, index = torch.topk(D, min(2 * k, m), dim=1, largest=False)
+        row_index = rows.unsqueeze(1).expand_as(index)
+        exact = self.exact_distances(parts, row_index, index, combine)
+        exact = torch.where(torch.isinf(approx), approx, exact)
+        exact = torch.sort(exact, dim=1).values[:, :k]
+        # the samples outside of the candidates are at least as far as the
+        # last candidate under the approximate distances
+        incomplete = approx[:, -1] < exact[:, -1] + tolerance[:, 0]
+        if approx.shape[1] == m:
+            incomplete.zero_()
+        for row in torch.nonzero(incomplete)[:, 0].tolist():
+            col_index = torch.arange(m, device=D.device)
+            row_index = rows[row].expand(m)
+            full = self.exact_distances(parts, row_index, col_index, combine)
+            full = torch.where(torch.isinf(D[row]), D[row], full)
+            exact[row] = torch.topk(full, k, largest=False).values
+        return exact
+
+    def count_within(self, t, rows, D, tolerance, bound, strict=True):
+        """
+        Number of samples whose exact squared distance to every sample of
+        `rows` is below `bound` (or at most `bound` if not `strict`), only the
+        pairs within the error bound `tolerance` of `bound` are recomputed.
+
+        """
+        lower, upper = bound - tolerance, bound + tolerance
+        count = torch.sum(D < lower, dim=1)
+        uncertain = torch.nonzero(torch.sum(D <= upper, dim=1) > count)[:, 0]
+        if uncertain.shape[0] > 0:
+            band = D[uncertain]
+            band = (band >= lower[uncertain]) & (band <= upper[uncertain])
+            pairs = torch.nonzero(band)
+            row_index = uncertain[pairs[:, 0]]
+            exact = self.pair_distances(t, rows[row_index], pairs[:, 1])
+            bound = bound[row_index, 0]
+            inside = exact < bound if strict else exact <= bound
+            count = count.index_add(0, row_index, inside.long())
+        return count
+
+    def class_neighbours(self, labels):
+        """
+        Per-sample number of neighbours `min(k, m_c - 1)` available in the
+        class of every sample along with the class sizes `m_c`.
+
+        """
+        _, inverse, counts = torch.unique(
+            labels, return_inverse=True, return_counts=True
+        )
+        class_size = counts[inverse]
+        return torch.clamp(class_size - 1, max=self.k), class_size
+
+    def log_volume(self, d):
+        # log volume of the d dimensional euclidean unit ball
+        return (d / 2) * math.log(math.pi) - math.lgamma(d / 2 + 1)
+
+    def mutual_information(self, x, y):
+        m, d_x = x.shape
+        k = min(self.k, m - 1)
+        if y.is_floating_point():
+            d_y = y.shape[1]
+            radii = []
+            for rows in self.tiles(m):
+                D_x, tolerance_x = self.squared_distances(x, rows)
+                D_y, tolerance_y = self.squared_distances(y, rows)
+                D_xy = D_x + D_y
+                tolerance_xy = tolerance_x + tolerance_y
+                r_x = self.nearest([x], rows, D_x, tolerance_x, k)
+                r_y = self.nearest([y], rows, D_y, tolerance_y, k)
+                r_xy = self.nearest([x, y], rows, D_xy, tolerance_xy, k)
+                radii.append(torch.stack([r_x[:, -1], r_y[:, -1], r_xy[:, -1]]))
+            radii = torch.cat(radii, dim=1).double()
+            # the density estimate is undefined at duplicated samples
+            radii = radii[:, torch.all(radii > 0, dim=0)]
+            if radii.shape[1] == 0:
+                return torch.zeros((), device=self.device)
+            log_radii = 0.5 * torch.log(radii)
+            d = torch.tensor([d_x, d_y, -(d_x + d_y)], dtype=torch.float64)
+            mut_info = torch.sum(d.to(self.device) * log_radii.mean(dim=1))
+            mut_info = mut_info + torch.digamma(torch.tensor(float(m))).item()
+            mut_info = mut_info - torch.digamma(torch.tensor(float(k))).item()
+            mut_info = mut_info + self.log_volume(d_x) + self.log_volume(d_y)
+            mut_info = mut_info - self.log_volume(d_x + d_y)
+            return (mut_info / math.log(2)).float()
+        neighbours, class_size = self.class_neighbours(y)
+        contributions = []
+        for rows in self.tiles(m):
+            D, tolerance = self.squared_distances(x, rows)
+            radius = self.nearest([x], rows, D, tolerance, k)[:, -1]
+            D.masked_fill_(y[rows].unsqueeze(1) != y.unsqueeze(0), math.inf)
+            k_c = neighbours[rows]
+            class_k = torch.clamp(k_c, min=1)
+            class_radius = self.nearest([x], rows, D, tolerance, k)
+            class_radius = torch.gather(class_radius, 1, class_k.unsqueeze(1) - 1)
+            class_radius = class_radius[:, 0]
+            # the density estimate is undefined at duplicated samples
+            defined = (radius > 0) & (class_radius > 0)
+            log_ratio = 0.5 * torch.log(
+                torch.where(defined, radius, torch.ones_like(radius)).double()
+            )
+            log_ratio = log_ratio - 0.5 * torch.log(
+                torch.where(defined, class_radius, torch.ones_like(radius)).double()
+            )
+            contribution = (
+                torch.digamma(torch.tensor(float(m), dtype=torch.float64))
+                - torch.digamma(torch.tensor(float(k), dtype=torch.float64))
+                - torch.digamma(class_size[rows].double())
+                + torch.digamma(class_k.double())
+                + d_x * log_ratio
+            )
+            # samples alone in their class carry no information
+            contribution = torch.where(
+                k_c > 0, contribution, torch.zeros_like(contribution)
+            )
+            contributions.append(contribution[defined | (k_c == 0)])
+        contributions = torch.cat(contributions)
+        if contributions.shape[0] == 0:
+            return torch.zeros((), device=self.device)
+        mut_info = torch.mean(contributions)
+        return (mut_info / math.log(2)).float()
+
+    def criterion(self, x, y):
+        """
+        Defines the k-nearest neighbour estimate of mutual information.
+
+        """
+        return self.mutual_information(self.prepare(x), self.prepare(y))
+
+    def eval_dynamics_segment(self, dynamics_segment):
+        """
+        Process smallest segment of dynamics and calculate coordinates, the
+        input and label are prepared only once for all the layers.
+
+
+        Arguments:
+            dynamics_segment (iterable): smallest segment of the dynamics of a batch containing input, hidden layer output and label in form of :class:`torch.Tensor` objects
+
+        Returns:
+            (iterable): list of calculated coordinates according to the criterion with length equal to 'len(dynamics_segment)-2'
+
+        """
+        segment_size = len(dynamics_segment)
+        x = self.prepare(dynamics_segment[0])
+        y = self.prepare(dynamics_segment[segment_size - 1])
+        output_segment = []
+        for idx in range(1, segment_size - 1):
+            h = self.prepare(dynamics_segment[idx])
+            output_segment.append(
+                [self.mutual_information(h, x), self.mutual_information(h, y)]
+            )
+        return output_segment
 
-class KDE(_Estimator):
-    # TODO
 
+class KSG(KNN):
+    """
+    Mutual information estimator of Kraskov, Stögbauer & Grassberger
+    (algorithm 1) from the paper "Estimating Mutual Information". The radius
+    of every sample is the distance to its k-th neighbour in the joint space
+    under the max-norm of the marginal distances, and the neighbours of the
+    marginal spaces strictly within that radius are counted. For integer
+    valued targets (class labels) the variant of Ross "Mutual Information
+    between Discrete and Continuous Data Sets" is used.
+
+    Neighbour search and counting are done in tiles of query rows as in
+    :class:`KNN`. Marginal distances are euclidean by default which are
+    computed with matrix products, `p=float('inf')` gives the max-norm in the
+    marginal spaces as well at a much higher cost in high dimensions.
+    Mutual information is measured in bits.
+
+
+    Arguments:
+        k (int, optional): number of nearest neighbours (default: 3)
+        p (float, optional): order of the norm in the marginal spaces, either 2 or float('inf') (default: 2)
+        tile_size (int, optional): number of query rows searched at once (default: 1024)
+        num_queries (int, optional): number of randomly drawn query samples for the approximate mode, all the samples are queries if None (default: None)
+        seed (int, optional): seed for drawing the query samples (default: 0)
+        gpu (bool): if true then all the computation is carried on `GPU` else on `CPU`
+        dtype (torch.dtype, optional): floating point precision of the distances (default: torch.float32)
+        **kwargs: the keyword that stores parameters for the estimator
+
+    """
+
+    def __init__(
+        self,
+        k=3,
+        p=2,
+        tile_size=1024,
+        num_queries=None,
+        seed=0,
+        gpu=True,
+        dtype=torch.float32,
+        **kwargs
+    ):
+        super().__init__(k, tile_size, num_queries, seed, gpu, dtype, **kwargs)
+        if p not in (2, math.inf):
+            raise ValueError("Could not interpret " "norm order:", p)
+        self.p = p
+
+    def squared_distances(self, t, rows):
+        if self.p == 2:
+            return super().squared_distances(t, rows)
+        # max-norm distances are computed without cancellation
+        D = torch.cdist(t[rows], t, p=math.inf) ** 2
+        D = D.scatter_(1, rows.unsqueeze(1), math.inf)
+        return D, torch.zeros_like(D[:, :1])
+
+    def pair_distances(self, t, row_index, col_index):
+        if self.p == 2:
+            return super().pair_distances(t, row_index, col_index)
+        return torch.amax(torch.abs(t[row_index] - t[col_index]), dim=-1) ** 2
+
+    def mutual_information(self, x, y):
+        m = x.shape[0]
+        k = min(self.k, m - 1)
+        digamma_counts = []
+        if y.is_floating_point():
+            for rows in self.tiles(m):
+                D_x, tolerance_x = self.squared_distances(x, rows)
+                D_y, tolerance_y = self.squared_distances(y, rows)
+                radius = self.nearest(
+                    [x, y],
+                    rows,
+                    torch.max(D_x, D_y),
+                    torch.max(tolerance_x, tolerance_y),
+                    k,
+                    torch.max,
+                )[:, -1:]
+                n_x = self.count_within(x, rows, D_x, tolerance_x, radius)
+                n_y = self.count_within(y, rows, D_y, tolerance_y, radius)
+                digamma_counts.append(
+                    torch.digamma(n_x + 1.0) + torch.digamma(n_y + 1.0)
+                )
+            mut_info = torch.digamma(torch.tensor(float(k))) + torch.digamma(
+                torch.tensor(float(m))
+            )
+            mut_info = mut_info.to(self.device) - torch.mean(torch.cat(digamma_counts))
+            return mut_info / math.log(2)
+        neighbours, class_size = self.class_neighbours(y)
+        for rows in self.tiles(m):
+            D, tolerance = self.squared_distances(x, rows)
+            same = y[rows].unsqueeze(1) == y.unsqueeze(0)
+            k_c = torch.clamp(neighbours[rows], min=1)
+            class_radius = self.nearest(
+                [x],
+                rows,
+                torch.where(same, D, torch.full_like(D, math.inf)),
+                tolerance,
+                k,
+            )
+            class_radius = torch.gather(class_radius, 1, k_c.unsqueeze(1) - 1)
+            n = self.count_within(x, rows, D, tolerance, class_radius, strict=False)
+            digamma_counts.append(
+                torch.where(
+                    neighbours[rows] > 0,
+                    torch.digamma(class_size[rows].float())
+                    + torch.digamma(n.float())
+                    - torch.digamma(k_c.float()),
+                    # samples alone in their class carry no information
+                    torch.digamma(torch.full_like(D[:, 0], float(m))),
+                )
+            )
+        mut_info = torch.digamma(torch.tensor(float(m))).to(self.device)
+        mut_info = mut_info - torch.mean(torch.cat(digamma_counts))
+        return mut_info / math.log(2)
+
+
+class NeuralEstimator(Estimator):
+    """
+    Base class for the estimators that train networks online alongside the
+    main network, the parameters of the networks are drawn from local
+    generators so that the global random number generator of the training is
+    left untouched.
+
+
+    Arguments:
+        num_classes (int, optional): number of classes for one-hot encoding integer valued targets (default: None)
+        seed (int, optional): seed for initializing the networks and drawing samples (default: 0)
+        gpu (bool): if true then all the computation is carried on `GPU` else on `CPU`
+        **kwargs: the keyword that stores parameters for the estimator
+
+    """
+
+    def __init__(self, num_classes=None, seed=0, gpu=True, **kwargs):
+        super().__init__(gpu, **kwargs)
+        self.num_classes = num_classes
+        self.seed = seed
+        self.generator = torch.Generator().manual_seed(seed)
+
+    def prepare(self, t):
+        m = t.shape[0]
+        t = t.detach().to(self.device)
+        if not t.is_floating_point():
+            if self.num_classes is None:
+                raise Exception("Cannot find argument num_classes for the labels")
+            t = nn.functional.one_hot(t.reshape(m), self.num_classes)
+        return t.float().reshape(m, -1)
+
+    def linear(self, in_features, out_features, generator):
+        """
+        Linear layer with the default initialization of :class:`torch.nn.Linear`
+        drawn from `generator` instead of the global random number generator.
+
+        """
+        layer = nn.utils.skip_init(nn.Linear, in_features, out_features)
+        bound = 1 / math.sqrt(in_features)
+        with torch.no_grad():
+            layer.weight.uniform_(-bound, bound, generator=generator)
+            layer.bias.uniform_(-bound, bound, generator=generator)
+        return layer
+
+    def seeded_generator(self, index):
+        """
+        Local generator for initializing the network number `index`.
+
+        """
+        return torch.Generator().manual_seed(self.seed + index)
+
+
+class MINE(NeuralEstimator):
+    """
+    Mutual Information Neural Estimation as proposed in the paper "Mutual
+    Information Neural Estimation" trained online alongside the main network.
+
+    A statistics network `T(h, t)` is kept for every layer and target pair
+    (input and label) across batches and takes `num_steps` gradient steps on
+    the Donsker-Varadhan bound for every evaluated batch, the gradient uses a
+    moving average of the partition term to correct its bias. The steps use
+    at most `batch_size` samples of the batch so the cost per batch stays a
+    small and bounded fraction of the training step. The returned estimate is
+    a running average of the bound over batches. Mutual information is
+    measured in bits.
+
+
+    Arguments:
+        hidden_size (int, optional): width of the hidden layers of the statistics networks (default: 64)
+        num_steps (int, optional): number of gradient steps per evaluated batch (default: 1)
+        batch_size (int, optional): maximum number of samples used for one gradient step (default: 256)
+        learning_rate (float, optional): learning rate of the Adam optimizer of the statistics networks (default: 0.0001)
+        moving_average_rate (float, optional): rate of the moving average of the partition term used for the bias correction (default: 0.01)
+        smoothing (float, optional): smoothing factor of the running estimate, 0 returns the bound of the current batch (default: 0.9)
+        num_classes (int, optional): number of classes for one-hot encoding integer valued targets (default: None)
+        seed (int, optional): seed for initializing the statistics networks and drawing samples (default: 0)
+        gpu (bool): if true then all the computation is carried on `GPU` else on `CPU`
+        **kwargs: the keyword that stores parameters for the estimator
+
+    Attributes:
+        networks (dict): statistics network for each key
+        optimizers (dict): optimizer of the statistics network for each key
+        moving_averages (dict): moving average of the partition term for each key
+        running_estimates (dict): running estimate of mutual information (in nats) for each key
+
+    """
+
+    def __init__(
+        self,
+        hidden_size=64,
+        num_steps=1,
+        batch_size=256,
+        learning_rate=1e-4,
+        moving_average_rate=0.01,
+        smoothing=0.9,
+        num_classes=None,
+        seed=0,
+        gpu=True,
+        **kwargs
+    ):
+        super().__init__(num_classes, seed, gpu, **kwargs)
+        self.hidden_size = hidden_size
+        self.num_steps = num_steps
+        self.batch_size = batch_size
+        self.learning_rate = learning_rate
+        self.moving_average_rate = moving_average_rate
+        self.smoothing = smoothing
+        self.networks = {}
+        self.optimizers = {}
+        self.moving_averages = {}
+        self.running_estimates = {}
+
+    def network(self, key, input_size):
+        """
+        Returns the statistics network for `key`, creating it along with its
+        optimizer on first use.
+
+        """
+        if key not in self.networks.keys():
+            generator = self.seeded_generator(len(self.networks))
+            network = nn.Sequential(
+                self.linear(input_size, self.hidden_size, generator),
+                nn.ReLU(),
+                self.linear(self.hidden_size, self.hidden_size, generator),
+                nn.ReLU(),
+                self.linear(self.hidden_size, 1, generator),
+            )
+            self.networks[key] = network.to(self.device)
+            self.optimizers[key] = torch.optim.Adam(
+                network.parameters(), lr=self.learning_rate
+            )
+        return self.networks[key]
+
+    def scores(self, network, h, t):
+        """
+        Statistics of the joint samples `(h, t)` and of the product of
+        marginals obtained by shuffling `t`.
+
+        """
+        shuffle = torch.randperm(t.shape[0], generator=self.generator)
+        joint = network(torch.cat([h, t], dim=1))
+        marginal = network(torch.cat([h, t[shuffle.to(self.device)]], dim=1))
+        return joint[:, 0], marginal[:, 0]
+
+    def step(self, key, h, t):
+        """
+        One gradient step of the statistics network for `key` on at most
+        `batch_size` samples of `(h, t)`.
+
+        """
+        network = self.network(key, h.shape[1] + t.shape[1])
+        optimizer = self.optimizers[key]
+        m = h.shape[0]
+        if m > self.batch_size:
+            index = torch.randperm(m, generator=self.generator)[: self.batch_size]
+            index = index.to(self.device)
+            h, t = h[index], t[index]
+        joint, marginal = self.scores(network, h, t)
+        partition = torch.mean(torch.exp(marginal))
+        rate = self.moving_average_rate
+        moving_average = self.moving_averages.get(key, partition.item())
+        moving_average = (1 - rate) * moving_average + rate * partition.item()
+        self.moving_averages[key] = moving_average
+        # the gradient of log(partition) is corrected by the moving average
+        loss = -(torch.mean(joint) - partition / moving_average)
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+
+    def estimate(self, key, h, t):
+        """
+        Trains the statistics network for `key` on the batch `(h, t)` and
+        returns the running estimate of mutual information.
+
+        """
+        with torch.enable_grad():
+            for _ in range(self.num_steps):
+                self.step(key, h, t)
+        with torch.no_grad():
+            joint, marginal = self.scores(self.networks[key], h, t)
+            bound = torch.mean(joint) - (
+                torch.logsumexp(marginal, dim=0) - math.log(marginal.shape[0])
+            )
+        if key in self.running_estimates.keys():
+            bound = (
+                self.smoothing * self.running_estimates[key]
+                + (1 - self.smoothing) * bound
+            )
+        self.running_estimates[key] = bound
+        return bound / math.log(2)
+
+    def criterion(self, x, y):
+        """
+        Defines the MINE estimate of mutual information, the statistics
+        network is keyed by the shapes of `x` and `y`.
+
+        """
+        x, y = self.prepare(x), self.prepare(y)
+        return self.estimate((x.shape[1], y.shape[1]), x, y)
+
+    def eval_dynamics_segment(self, dynamics_segment):
+        """
+        Process smallest segment of dynamics and calculate coordinates, every
+        layer has its own statistics networks for the input and the label.
+
+
+        Arguments:
+            dynamics_segment (iterable): smallest segment of the dynamics of a batch containing input, hidden layer output and label in form of :class:`torch.Tensor` objects
+
+        Returns:
+            (iterable): list of calculated coordinates according to the criterion with length equal to 'len(dynamics_segment)-2'
+
+        """
+        segment_size = len(dynamics_segment)
+        x = self.prepare(dynamics_segment[0])
+        y = self.prepare(dynamics_segment[segment_size - 1])
+        output_segment = []
+        for idx in range(1, segment_size - 1):
+            h = self.prepare(dynamics_segment[idx])
+            output_segment.append(
+                [self.estimate((idx, "x"), h, x), self.estimate((idx, "y"), h, y)]
+            )
+        return output_segment
+
+
+class InfoNCE(NeuralEstimator):
+    """
+    Contrastive lower bound on mutual information from the paper
+    "Representation Learning with Contrastive Predictive Coding", using the
+    other samples of the batch as negatives.
+
+    The critic is separable, `f(h)^T g(t)`, so the scores of all the pairs of
+    a batch are a single (m, k) x (k, m) matrix product of the embeddings and
+    the bound is `log(m) + mean_i (S_ii - logsumexp_j S_ij)`. The encoders are
+    kept across batches and trained online, `num_steps` gradient steps of all
+    the layers together for every evaluated batch on at most `batch_size`
+    samples. The bound of the whole batch is evaluated in tiles of
+    `batch_size` rows and is smoothed over batches. Mutual information is
+    measured in bits and can not exceed `log2(m)`.
+
+    With `shared_critic` every layer has a single encoder used against both
+    the input and the label, and the input and label encoders are shared by
+    all the layers, else every layer and target pair has its own encoders.
+
+
+    Arguments:
+        embedding_size (int, optional): dimension `k` of the critic embeddings (default: 64)
+        hidden_size (int, optional): width of the hidden layer of the encoders (default: 128)
+        num_steps (int, optional): number of gradient steps per evaluated batch (default: 1)
+        batch_size (int, optional): maximum number of samples used for one gradient step (default: 256)
+        learning_rate (float, optional): learning rate of the Adam optimizer of the encoders (default: 0.0001)
+        shared_critic (bool, optional): if true then shares the encoders across layers (default: False)
+        smoothing (float, optional): smoothing factor of the running estimate, 0 returns the bound of the current batch (default: 0.9)
+        num_classes (int, optional): number of classes for one-hot encoding integer valued targets (default: None)
+        seed (int, optional): seed for initializing the encoders and drawing samples (default: 0)
+        gpu (bool): if true then all the computation is carried on `GPU` else on `CPU`
+        **kwargs: the keyword that stores parameters for the estimator
+
+    Attributes:
+        encoders (dict): encoder for each key
+        running_estimates (dict): running estimate of mutual information (in nats) for each layer and target pair
+
+    """
+
+    def __init__(
+        self,
+        embedding_size=64,
+        hidden_size=128,
+        num_steps=1,
+        batch_size=256,
+        learning_rate=1e-4,
+        shared_critic=False,
+        smoothing=0.9,
+        num_classes=None,
+        seed=0,
+        gpu=True,
+        **kwargs
+    ):
+        super().__init__(num_classes, seed, gpu, **kwargs)
+        self.embedding_size = embedding_size
+        self.hidden_size = hidden_size
+        self.num_steps = num_steps
+        self.batch_size = batch_size
+        self.learning_rate = learning_rate
+        self.shared_critic = shared_critic
+        self.smoothing = smoothing
+        self.encoders = {}
+        self.optimizer = None
+        self.running_estimates = {}
+
+    def encoder(self, key, input_size):
+        """
+        Returns the encoder for `key`, creating it on first use and adding its
+        parameters to the optimizer.
+
+        """
+        if key not in self.encoders.keys():
+            generator = self.seeded_generator(len(self.encoders))
+            encoder = nn.Sequential(
+                self.linear(input_size, self.hidden_size, generator),
+                nn.ReLU(),
+                self.linear(self.hidden_size, self.embedding_size, generator),
+            )
+            self.encoders[key] = encoder.to(self.device)
+            if self.optimizer is None:
+                self.optimizer = torch.optim.Adam(
+                    encoder.parameters(), lr=self.learning_rate
+                )
+            else:
+                self.optimizer.add_param_group({"params": encoder.parameters()})
+        return self.encoders[key]
+
+    def critic_keys(self, idx, target):
+        """
+        Keys of the encoders of the layer `idx` and the target ('x' or 'y').
+
+        """
+        if self.shared_critic:
+            return ("h", idx), target
+        return ("h", idx, target), (target, idx)
+
+    def bound(self, h_embedding, t_embedding):
+        """
+        InfoNCE bound (in nats) from the embeddings of shape (m, k), the
+        scores are computed in tiles of `batch_size` rows.
+
+        """
+        m = h_embedding.shape[0]
+        total = 0
+        for start in range(0, m, self.batch_size):
+            S = torch.mm(h_embedding[start : start + self.batch_size], t_embedding.t())
+            positive = torch.diagonal(S, offset=start)
+            total = total + torch.sum(positive - torch.logsumexp(S, dim=1))
+        return total / m + math.log(m)
+
+    def estimate(self, pairs):
+        """
+        Trains the encoders on the batch and returns the running estimates.
+
+        Arguments:
+            pairs (iterable): list of (h_key, t_key, h, t) tuples of the encoder keys and the samples of every pair
+
+        Returns:
+            (iterable): running estimate of mutual information for every pair
+
+        """
+        critics = [
+            (self.encoder(h_key, h.shape[1]), self.encoder(t_key, t.shape[1]))
+            for h_key, t_key, h, t in pairs
+        ]
+        m = pairs[0][2].shape[0]
+        with torch.enable_grad():
+            for _ in range(self.num_steps):
+                index = torch.randperm(m, generator=self.generator)
+                index = index[: self.batch_size].to(self.device)
+                loss = 0
+                for (f, g), (_, _, h, t) in zip(critics, pairs):
+                    loss = loss - self.bound(f(h[index]), g(t[index]))
+                self.optimizer.zero_grad()
+                loss.backward()
+                self.optimizer.step()
+        estimates = []
+        with torch.no_grad():
+            for (f, g), (h_key, t_key, h, t) in zip(critics, pairs):
+                bound = self.bound(f(h), g(t))
+                if (h_key, t_key) in self.running_estimates.keys():
+                    bound = (
+                        self.smoothing * self.running_estimates[(h_key, t_key)]
+                        + (1 - self.smoothing) * bound
+                    )
+                self.running_estimates[(h_key, t_key)] = bound
+                estimates.append(bound / math.log(2))
+        return estimates
+
+    def criterion(self, x, y):
+        """
+        Defines the InfoNCE estimate of mutual information, the encoders are
+        keyed by the shapes of `x` and `y`.
+
+        """
+        x, y = self.prepare(x), self.prepare(y)
+        return self.estimate([(("h", x.shape[1]), ("t", y.shape[1]), x, y)])[0]
+
+    def eval_dynamics_segment(self, dynamics_segment):
+        """
+        Process smallest segment of dynamics and calculate coordinates, the
+        encoders of all the layers are trained together.
+
+
+        Arguments:
+            dynamics_segment (iterable): smallest segment of the dynamics of a batch containing input, hidden layer output and label in form of :class:`torch.Tensor` objects
+
+        Returns:
+            (iterable): list of calculated coordinates according to the criterion with length equal to 'len(dynamics_segment)-2'
+
+        """
+        segment_size = len(dynamics_segment)
+        x = self.prepare(dynamics_segment[0])
+        y = self.prepare(dynamics_segment[segment_size - 1])
+        pairs = []
+        for idx in range(1, segment_size - 1):
+            h = self.prepare(dynamics_segment[idx])
+            for target, t in (("x", x), ("y", y)):
+                h_key, t_key = self.critic_keys(idx, target)
+                pairs.append((h_key, t_key, h, t))
+        estimates = self.estimate(pairs)
+        return [estimates[i : i + 2] for i in range(0, len(estimates), 2)]
+
+
+class SlicedMI(Estimator):
+    """
+    Sliced mutual information as proposed in the paper "Sliced Mutual
+    Information: A Scalable Measure of Statistical Dependence", the average
+    of the mutual information between one-dimensional random projections of
+    the two variables.
+
+    The `num_projections` directions of a variable are drawn as a single
+    (d, num_projections) matrix (seeded by `seed` and the dimension) and all
+    the samples are projected with one matrix product. Every projection is
+    discretized into `num_bins` bins, either of equal width or of equal mass
+    from the ranks of the samples, and the joint histograms of all the slices
+    are obtained with a single `bincount` so the cost is linear in m and d.
+    Integer valued targets (class labels) are used without projection.
+    Mutual information is measured in bits.
+
+
+    Arguments:
+        num_projections (int, optional): number of random directions (default: 128)
+        num_bins (int, optional): number of bins of every projection (default: 16)
+        binning (str, optional): 'uniform' for equal width bins or 'rank' for equal mass bins (default: 'uniform')
+        seed (int, optional): seed for drawing the directions (default: 0)
+        gpu (bool): if true then all the computation is carried on `GPU` else on `CPU`
+        dtype (torch.dtype, optional): floating point precision of the projections (default: torch.float32)
+        **kwargs: the keyword that stores parameters for the estimator
+
+    """
+
+    def __init__(
+        self,
+        num_projections=128,
+        num_bins=16,
+        binning="uniform",
+        seed=0,
+        gpu=True,
+        dtype=torch.float32,
+        **kwargs
+    ):
+        super().__init__(gpu, **kwargs)
+        if binning not in ("uniform", "rank"):
+            raise ValueError("Could not interpret " "binning identifier:", binning)
+        self.num_projections = num_projections
+        self.num_bins = num_bins
+        self.binning = binning
+        self.seed = seed
+        self.dtype = dtype
+        self.projections = {}  # random directions for each input dimension and role
+
+    def get_projection(self, dim, role):
+        if (dim, role) not in self.projections.keys():
+            generator = torch.Generator().manual_seed(self.seed + 2 * dim + role)
+            theta = torch.randn(
+                dim, self.num_projections, generator=generator, dtype=self.dtype
+            )
+            theta = theta / torch.norm(theta, dim=0)
+            self.projections[(dim, role)] = theta.to(self.device)
+        return self.projections[(dim, role)]
+
+    def codes(self, t, role):
+        """
+        Bin codes of shape (num_projections, m) of the projections of `t`,
+        class labels are returned with shape (1, m).
+
+        Returns:
+            (tuple): tuple containing:
+                (torch.Tensor): bin codes of every slice
+                (int): number of distinct codes
+
+        """
+        m = t.shape[0]
+        t = t.to(self.device)
+        if not t.is_floating_point():
+            _, labels = torch.unique(t.reshape(m, -1)[:, 0], return_inverse=True)
+            return labels.unsqueeze(0), int(labels.max()) + 1
+        t = t.to(self.dtype).reshape(m, -1)
+        z = torch.mm(t, self.get_projection(t.shape[1], role)).t().contiguous()
+        if self.binning == "rank":
+            ranks = torch.argsort(torch.argsort(z, dim=1), dim=1)
+            return ranks * self.num_bins // m, self.num_bins
+        low = torch.min(z, dim=1, keepdim=True).values
+        high = torch.max(z, dim=1, keepdim=True).values
+        width = torch.clamp((high - low) / self.num_bins, min=1e-12)
+        codes = torch.clamp(torch.floor((z - low) / width), 0, self.num_bins - 1)
+        return codes.long(), self.num_bins
+
+    def entropy(self, counts, m):
+        p = counts.double() / m
+        return -torch.sum(torch.special.xlogy(p, p), dim=-1)
+
+    def mutual_information(self, x_codes, y_codes):
+        """
+        Average mutual information over the slices from the bin codes of two
+        variables as returned by :meth:`codes`.
+
+        """
+        (a, n_a), (b, n_b) = x_codes, y_codes
+        num_slices, m = max(a.shape[0], b.shape[0]), a.shape[1]
+        a, b = a.expand(num_slices, m), b.expand(num_slices, m)
+        offset = torch.arange(num_slices, device=a.device).unsqueeze(1)
+        keys = (offset * n_a + a) * n_b + b
+        joint = torch.bincount(keys.reshape(-1), minlength=num_slices * n_a * n_b)
+        joint = joint.view(num_slices, n_a, n_b)
+        mut_info = (
+            self.entropy(joint.sum(dim=2), m)
+            + self.entropy(joint.sum(dim=1), m)
+            - self.entropy(joint.view(num_slices, -1), m)
+        )
+        return (torch.mean(mut_info) / math.log(2)).float()
+
+    def criterion(self, x, y):
+        """
+        Defines the sliced estimate of mutual information.
 
-class KSG(_Estimator):
-    # TODO
+        """
+        return self.mutual_information(self.codes(x, 0), self.codes(y, 1))
 
+    def eval_dynamics_segment(self, dynamics_segment):
+        """
+        Process smallest segment of dynamics and calculate coordinates, the
+        input and label are projected only once for all the layers.
 
-class KNN(_Estimator):
-    # TODO
 
+        Arguments:
+            dynamics_segment (iterable): smallest segment of the dynamics of a batch containing input, hidden layer output and label in form of :class:`torch.Tensor` objects
 
-class MINE(_Estimator):
-    # TODO
+        Returns:
+            (iterable): list of calculated coordinates according to the criterion with length equal to 'len(dynamics_segment)-2'
 
-"""
+        """
+        segment_size = len(dynamics_segment)
+        x_codes = self.codes(dynamics_segment[0], 1)
+        y_codes = self.codes(dynamics_segment[segment_size - 1], 1)
+        output_segment = []
+        for idx in range(1, segment_size - 1):
+            h_codes = self.codes(dynamics_segment[idx], 0)
+            output_segment.append(
+                [
+                    self.mutual_information(h_codes, x_codes),
+                    self.mutual_information(h_codes, y_codes),
+                ]
+            )
+        return output_segment
 
 
 class EDGE(Estimator):
@@ -104,62 +1299,259 @@ class EDGE(Estimator):
     Mutual information technique propsed in the paper
     'SCALABLE MUTUAL INFORMATION ESTIMATION USING DEPENDENCE GRAPHS'
 
+    Both the variables are hashed into the nodes of the dependency graph and
+    the node and edge counts are obtained with `bincount` and `unique`, so
+    the criterion is O(m) in memory and the mutual information sum runs only
+    over the non-empty edges.
+
+    With `ensemble_size` K > 1 the estimate is averaged over K random
+    offsets `b` of `floor_hash`. Counting the nodes and edges of every member
+    costs O(m K), with the codes of all the members derived from one set of
+    base codes (see :func:`glow.hash_functions.ensemble_floor_hash`). Over
+    the sorted offsets the node of a sample only changes at most `min(d, K)`
+    times for d dimensions, see :func:`glow.hash_functions.floor_hash_states`,
+    so once K exceeds the number of dimensions of the floating point
+    variables the counts of all the members are swept from those changes
+    instead, which costs O(m d) plus O(K) and no longer grows with K.
+
 
     Arguments:
         hash_function (callable or str): hash function which is used to obtain mapping from data to dependency graph nodes as described in EDGE algorithm
         gpu (bool, optional): if true then all the computation is carried on `GPU` else on `CPU`
-        **kwargs: the keyword that stores parameters for EDGE algorithm mutual information criterion
+        ensemble_size (int, optional): number of random offsets of `floor_hash` to average over, the `b` argument is then not used (default: 1)
+        seed (int, optional): seed for drawing the random offsets (default: 0)
+        **kwargs: the keyword that stores parameters for EDGE algorithm mutual information criterion, `F` is the number of nodes of the dependency graph per sample
 
     """
 
-    def __init__(self, hash_function, gpu=True, **kwargs):
+    def __init__(self, hash_function, gpu=True, ensemble_size=1, seed=0, **kwargs):
         super().__init__(gpu, **kwargs)
+        if "F" not in self.params_dict.keys():
+            raise Exception(
+                "Cannot find argument for number of nodes of dependency graph in EDGE estimator"
+            )
         self.hash_function = hash_function
+        self.ensemble_size = ensemble_size
+        if ensemble_size > 1:
+            if hash_function != "floor_hash":
+                raise Exception("EDGE ensemble is only supported for floor_hash")
+            if "epsilon" not in self.params_dict.keys():
+                raise Exception(
+                    "Cannot find argument epsilon for hash function floor_hash"
+                )
+            generator = torch.Generator().manual_seed(seed)
+            offsets = torch.rand(ensemble_size, generator=generator)
+            self.offsets = (self.params_dict["epsilon"] * offsets).to(self.device)
+        elif callable(hash_function):
+            self.hash = hash_function
+        else:
+            self.hash = hash_module.get(hash_function, self.params_dict)
 
     def g(self, x):
         return x * torch.log(x) * (1 / math.log(10))
 
-    def criterion(self, x, y):
+    def node_ids(self, x, F):
         """
-        Defines the criterion of the EDGE estimator algorithm which have
-        mutual information as its criterion.
+        Hashes the samples `x` and maps the (possibly multi-dimensional) hash
+        codes of every sample of every member of the ensemble to a node of
+        the dependency graph, members never share nodes and every member has
+        at most `F` nodes.
+
+        Floating point samples of all the members are hashed at once with
+        :func:`glow.hash_functions.ensemble_floor_hash` and enumerated with
+        one batched sort, categorical samples are their own hash codes and
+        are enumerated only once.
+
+        Returns:
+            (tuple): tuple containing:
+                (torch.Tensor): consecutive node ids of shape (K, m), the nodes of every member follow those of the previous member
+                (torch.Tensor): number of samples in each node
 
         """
-        h = hash_module.get(self.hash_function, self.params_dict)
-        num_samples = x.shape[0]
-        if "F" in self.params_dict.keys():
-            F = self.params_dict["F"] * num_samples
+        m = x.shape[0]
+        K = self.ensemble_size
+        if not x.is_floating_point():
+            ids = hash_module.pack_codes(x).unsqueeze(0)
+        elif K == 1:
+            ids = hash_module.pack_codes(self.hash(x.reshape(m, -1))).unsqueeze(0)
         else:
-            raise Exception(
-                "Cannot find argument for number of nodes of dependency graph in EDGE estimator"
+            ids = hash_module.ensemble_floor_hash(
+                x, self.params_dict["epsilon"], self.offsets
             )
+        ids, counts = hash_module.enumerate_rows(ids)
+        if counts.shape[0] > ids.shape[0] * F:
+            # more nodes than the dependency graph has, fold them into F nodes
+            ids, counts = hash_module.enumerate_rows(ids % F)
+        if ids.shape[0] < K:
+            # every member has the same nodes
+            span = counts.shape[0]
+            member = torch.arange(K, device=ids.device).unsqueeze(1)
+            return ids + member * span, counts.repeat(K)
+        return ids, counts
+
+    def node_states(self, x):
+        """
+        Nodes of the samples `x` over the members of the ensemble in the
+        order of their sorted offsets as states of every sample, see
+        :func:`glow.hash_functions.floor_hash_states`, categorical samples
+        have a single state.
 
-        N = torch.zeros(F, 1)
-        M = torch.zeros(F, 1)
-        L = torch.zeros(F, F)
+        Returns:
+            (tuple): tuple containing:
+                (torch.Tensor): sample of every state, states are ordered by sample and rank
+                (torch.Tensor): rank of the first member of the state
+                (torch.Tensor): consecutive node ids of the states
+
+        """
+        if x.is_floating_point():
+            return hash_module.floor_hash_states(
+                x, self.params_dict["epsilon"], self.offsets
+            )[:3]
+        ids, _ = hash_module.enumerate_buckets(hash_module.pack_codes(x))
+        samples = torch.arange(ids.shape[0], device=ids.device)
+        return samples, torch.zeros_like(samples), ids
+
+    def joint_states(self, x_states, y_states):
+        """
+        Edges of the dependency graph as states of every sample, a joint
+        state starts whenever the node of either variable changes.
+
+        """
+        K = self.ensemble_size
+        samples = torch.cat([x_states[0], y_states[0]])
+        starts = torch.cat([x_states[1], y_states[1]])
+        is_x = torch.arange(samples.shape[0], device=samples.device)
+        is_x = is_x < x_states[0].shape[0]
+        ids = torch.cat([x_states[2], y_states[2]])
+        key = samples * (K + 1) + starts
+        key, order = torch.sort(key, stable=True)
+        samples, starts, is_x, ids = (
+            samples[order],
+            starts[order],
+            is_x[order],
+            ids[order],
+        )
+        # the current node of both variables from their last state
+        position = torch.arange(ids.shape[0], device=ids.device)
+        minus_one = torch.full_like(position, -1)
+        x_ids = ids[torch.cummax(torch.where(is_x, position, minus_one), 0)[0]]
+        y_ids = ids[torch.cummax(torch.where(is_x, minus_one, position), 0)[0]]
+        # every sample has a state of both variables at rank 0, the last
+        # element of every key has both of them
+        last = torch.ones_like(is_x)
+        last[:-1] = key[1:] != key[:-1]
+        edges = x_ids[last] * (int(y_states[2].max()) + 1) + y_ids[last]
+        edges, _ = hash_module.enumerate_buckets(edges)
+        return samples[last], starts[last], edges
+
+    def state_sums(self, states):
         """
-        for k, x_k in enumerate(x):
-            y_k = y[k]
-            i = h(x_k)
-            j = h(y_k)
-            N[i] = N[i] + 1
-            M[j] = M[j] + 1
-            L[i][j] = L[i][j] + 1
+        Sums `sum_n c_n log c_n` and the number of non-empty nodes over the
+        counts `c_n` of the nodes for every member of the ensemble in the
+        order of the sorted offsets.
+
+        The count of a node only changes at the ranks at which a state starts
+        or ends, the terms of the sums are computed at those ranks and spread
+        over the members up to the next change with a cumulative sum, which
+        costs O(T log T + K) for T states.
+
+        """
+        K = self.ensemble_size
+        samples, starts, ids = states
+        # a state lasts until the next state of its sample
+        ends = torch.full_like(starts, K)
+        same = samples[1:] == samples[:-1]
+        ends[:-1] = torch.where(same, starts[1:], ends[:-1])
+        nodes = torch.cat([ids, ids])
+        ranks = torch.cat([starts, ends])
+        delta = torch.cat([torch.ones_like(ids), -torch.ones_like(ids)])
+        within = ranks < K
+        key, order = torch.sort(nodes[within] * (K + 1) + ranks[within])
+        delta = delta[within][order]
+        nodes, ranks = key // (K + 1), key % (K + 1)
+        first = torch.ones_like(nodes, dtype=torch.bool)
+        first[1:] = nodes[1:] != nodes[:-1]
+        total = torch.cumsum(delta, dim=0)
+        counts = total - (total - delta)[first][torch.cumsum(first, dim=0) - 1]
+        # changes of a node at the same rank give empty intervals which cancel
+        next_ranks = torch.full_like(ranks, K)
+        next_ranks[:-1] = torch.where(first[1:], next_ranks[:-1], ranks[1:])
+        counts = counts.double()
+        terms = torch.stack(
+            [counts * torch.log(counts.clamp_min(1)), (counts > 0).double()], dim=1
+        )
+        sums = torch.zeros(K + 1, 2, dtype=terms.dtype, device=terms.device)
+        sums.index_add_(0, ranks, terms).index_add_(0, next_ranks, -terms)
+        sums = torch.cumsum(sums, dim=0)[:K]
+        return sums[:, 0], sums[:, 1]
+
+    def ensemble_criterion(self, x, y):
         """
-        N = torch.nn.functional.one_hot(N.long().view(-1, 1), F)
-        N = torch.sum(N, dim=0)
+        Mutual information estimate averaged over the members of the ensemble
+        and its spread.
 
-        M = torch.nn.functional.one_hot(M.long().view(-1, 1), F)
-        M = torch.sum(M, dim=0)
+        The estimate of a member is
+        `(log m + (sum L log L - sum N log N - sum M log M) / m) / log 10` over
+        the counts L of the edges and N, M of the nodes, whose sums are swept
+        over all the members at once with :meth:`state_sums` when K exceeds
+        the number of dimensions d of the floating point variables. Otherwise,
+        or when the nodes have to be folded into `F` nodes, every member is
+        counted separately.
 
+        Returns:
+            (tuple): tuple containing:
+                (torch.Tensor): mutual information averaged over the ensemble
+                (torch.Tensor): standard deviation of the mutual information over the ensemble
+
+        """
+        x, y = x.to(self.device), y.to(self.device)
+        num_samples = x.shape[0]
+        K = self.ensemble_size
+        F = max(1, int(self.params_dict["F"] * num_samples))
+        # a sample has up to min(d, K) + 1 states in every variable
+        dims = sum(t[0].numel() for t in (x, y) if t.is_floating_point())
+        if K > dims:
+            x_states, y_states = self.node_states(x), self.node_states(y)
+            S_x, nodes_x = self.state_sums(x_states)
+            S_y, nodes_y = self.state_sums(y_states)
+            if torch.sum(nodes_x) <= K * F and torch.sum(nodes_y) <= K * F:
+                S_xy, _ = self.state_sums(self.joint_states(x_states, y_states))
+                mut_info = math.log(num_samples) + (S_xy - S_x - S_y) / num_samples
+                mut_info = mut_info / math.log(10)
+                # members in the order of the offsets
+                rank = torch.argsort(self.offsets)
+                mut_info = torch.empty_like(mut_info).scatter_(0, rank, mut_info)
+                return mut_info.mean().float(), mut_info.std(unbiased=False).float()
+        i, N = self.node_ids(x, F)
+        j, M = self.node_ids(y, F)
+        # edges join nodes of the same member, enumerated per member
+        i_local = i - i.min(dim=1, keepdim=True).values
+        j_local = j - j.min(dim=1, keepdim=True).values
+        edges, L = hash_module.enumerate_rows(
+            i_local * (int(j_local.max()) + 1) + j_local
+        )
+        # every sample of an edge shares its nodes and ensemble member
+        num_edges = L.shape[0]
+        members = torch.arange(K, device=i.device).unsqueeze(1).expand(K, num_samples)
+        edges = edges.reshape(-1)
+        members = edges.new_zeros(num_edges).scatter_(0, edges, members.reshape(-1))
+        N = N[edges.new_zeros(num_edges).scatter_(0, edges, i.reshape(-1))].double()
+        M = M[edges.new_zeros(num_edges).scatter_(0, edges, j.reshape(-1))].double()
+        w = num_samples * L.double() / (N * M)
         n = (1 / num_samples) * N
         m = (1 / num_samples) * M
-        temp_matrix = torch.mm(N, torch.transpose(M, 0, 1))
-        zero_matrix = torch.zeros(F, F)
-        w = torch.addcdiv(zero_matrix, num_samples, L, temp_matrix)
-        temp_matrix = torch.mm(n, torch.transpose(m, 0, 1))
-        mut_info = torch.sum(temp_matrix * g_hat(w))
-        return mut_info
+        mut_info = torch.zeros(K, dtype=w.dtype, device=w.device).index_add(
+            0, members, n * m * self.g(w)
+        )
+        return mut_info.mean().float(), mut_info.std(unbiased=False).float()
+
+    def criterion(self, x, y):
+        """
+        Defines the criterion of the EDGE estimator algorithm which have
+        mutual information as its criterion.
+
+        """
+        return self.ensemble_criterion(x, y)[0]
 
 
 class HSIC(Estimator):
@@ -167,17 +1559,38 @@ class HSIC(Estimator):
     Class for estimating Hilbert-Schmidt Independence Criterion as done in
     paper "The HSIC Bottleneck: Deep Learning without Back-Propagation".
 
+    Gram matrices are centered using their row and column means so that the
+    criterion costs O(m^2) instead of the O(m^3) of explicit multiplication
+    with the centering matrix.
+
 
     Arguments:
         kernel (str): kernel which is used for calculating K matrix in HSIC criterion
         gpu (bool): if true then all the computation is carried on `GPU` else on `CPU`
+        estimate (str, optional): 'biased' for the estimate tr(K_x H K_y H) / (m - 1) or 'unbiased' for the unbiased estimate of Song et al. (default: 'biased')
+        dtype (torch.dtype, optional): floating point precision in which Gram matrices are computed, `torch.float32` or `torch.float64` (default: torch.float32)
+        num_classes (int, optional): number of classes of categorical targets, if given then integer valued targets are treated as class labels and their kernel is built directly from label equality (default: None)
         **kwargs: the keyword that stores parameters for HSIC criterion
 
     """
 
-    def __init__(self, kernel, gpu=True, **kwargs):
+    def __init__(
+        self,
+        kernel,
+        gpu=True,
+        estimate="biased",
+        dtype=torch.float32,
+        num_classes=None,
+        **kwargs
+    ):
         super().__init__(gpu, **kwargs)
         self.kernel = kernel
+        self.estimate = estimate
+        self.hsic_estimate = kernel_module.get_estimate(estimate)
+        if dtype not in (torch.float32, torch.float64):
+            raise ValueError("HSIC supports only torch.float32 and torch.float64 dtype")
+        self.dtype = dtype
+        self.num_classes = num_classes
 
     # Hilbert-Schmid Independence Criterion
     def criterion(self, x, y):
@@ -185,12 +1598,603 @@ class HSIC(Estimator):
         Defines the HSIC criterion.
 
         """
-        x, y = x.to(self.device), y.to(self.device)
+        if self.is_categorical(y) and self.estimate == "biased":
+            k_same, k_diff = self.label_kernel_values()
+            labels = y.to(self.device).reshape(-1).long()
+            return (k_same - k_diff) * kernel_module.hsic_labels(
+                self.gram(x), labels, self.num_classes
+            )
+        if (
+            self.kernel == "linear"
+            and not self.is_categorical(y)
+            and self.use_feature_space(x, y)
+        ):
+            m = x.shape[0]
+            x = x.to(self.device, self.dtype).reshape(m, -1)
+            y = y.to(self.device, self.dtype).reshape(m, -1)
+            return kernel_module.hsic_features(x, y, self.estimate)
+        return self.hsic_estimate(self.gram(x), self.gram(y))
+
+    def use_feature_space(self, x, y):
+        """
+        Decides whether HSIC with linear kernel is computed from the features
+        as |X^T H Y|^2, which costs O(m d_x d_y), instead of the two Gram
+        matrices, which costs O(m^2 (d_x + d_y)). The feature space
+        formulation is chosen when it has fewer multiply-adds.
+
+        """
+        m = x.shape[0]
+        d_x = x[0].numel()
+        d_y = y[0].numel()
+        return d_x * d_y < m * (d_x + d_y)
+
+    def is_categorical(self, y):
+        """
+        Returns true if `y` holds class labels, that is `num_classes` is set
+        and `y` is integer valued.
+
+        """
+        return self.num_classes is not None and not y.is_floating_point()
+
+    def label_kernel_values(self):
+        """
+        Kernel values of one-hot encoded labels of the same class and of
+        different classes, which are the only two values of the label kernel.
+
+        """
+        basis = torch.eye(2, dtype=self.dtype, device=self.device)
+        K = kernel_module.get(self.kernel)(basis, basis, self.params_dict)
+        return K[0, 0], K[0, 1]
+
+    def label_gram(self, y):
+        """
+        Builds the Gram matrix of class labels `y` straight from label
+        equality without one-hot encoding or distance computation.
+
+        """
+        labels = y.to(self.device).reshape(-1)
+        k_same, k_diff = self.label_kernel_values()
+        shape = k_same.shape + (1, 1)
+        equal = (labels.unsqueeze(0) == labels.unsqueeze(1)).to(self.dtype)
+        return k_diff.view(shape) + (k_same - k_diff).view(shape) * equal
+
+    def kernel_tag(self):
+        return ("gram", self.kernel, self.dtype, self.device)
+
+    def hsic_coordinates(self, dynamics_segment):
+        """
+        Computes HSIC between every hidden layer and the input and label of
+        the dynamics segment. Gram matrices of the layers are computed per
+        layer while centering and trace of all the layers are batched.
+
+
+        Arguments:
+            dynamics_segment (iterable): smallest segment of the dynamics of a batch containing input, hidden layer output and label in form of :class:`torch.Tensor` objects
+
+        Returns:
+            (torch.Tensor): coordinates of shape (..., L, 2) where last dimension stores HSIC with input and label respectively
+
+        """
+        segment_size = len(dynamics_segment)
+        x = dynamics_segment[0]
+        m = x.shape[0]
+        x = x.view(m, -1)
+        y = dynamics_segment[segment_size - 1].view(m, -1)
+        K_h = torch.stack(
+            [
+                self.gram(dynamics_segment[idx].view(m, -1))
+                for idx in range(1, segment_size - 1)
+            ],
+            dim=-3,
+        )
+        K_xy = torch.stack([self.gram(x), self.gram(y)], dim=-3)
+        # the stack is a fresh copy of the cached Gram matrices
+        return kernel_module.hsic_cross(
+            K_h, K_xy, self.estimate, inplace=not K_h.requires_grad
+        )
+
+    def eval_dynamics_segment(self, dynamics_segment):
+        """
+        Process smallest segment of dynamics and calculate HSIC coordinates of
+        all the hidden layers at once.
+
+
+        Arguments:
+            dynamics_segment (iterable): smallest segment of the dynamics of a batch containing input, hidden layer output and label in form of :class:`torch.Tensor` objects
+
+        Returns:
+            (iterable): list of calculated coordinates according to the criterion with length equal to 'len(dynamics_segment)-2'
+
+        """
+        if self.kernel == "linear":
+            # linear kernel chooses between Gram and feature space per layer
+            return super().eval_dynamics_segment(dynamics_segment)
+        coordinates = self.hsic_coordinates(dynamics_segment)
+        return [[c[0], c[1]] for c in coordinates]
+
+    def gram(self, x):
+        """
+        Computes the Gram matrix of `x` using the kernel of the estimator,
+        the result is shared through the active
+        :class:`glow.utils.hsic_utils.GramCache` if any.
+
+        """
+        if self.is_categorical(x):
+            tag = ("labels",) + self.kernel_tag()
+            return kernel_module.cached(
+                x, tag, self.params_dict, lambda: self.label_gram(x)
+            )
+
+        def compute():
+            t = x.to(self.device, self.dtype)
+            return kernel_module.get(self.kernel)(t, t, self.params_dict)
+
+        return kernel_module.cached(x, self.kernel_tag(), self.params_dict, compute)
+
+
+class RandomFeatureHSIC(Estimator):
+    """
+    Approximate HSIC with gaussian kernel using random Fourier features as
+    proposed in the paper "Random Features for Large-Scale Kernel Machines".
+
+    Activations are mapped to `num_features` random features and HSIC is
+    computed from the centered cross-covariance of the features which makes
+    the criterion linear in the number of samples.
+
+
+    Arguments:
+        num_features (int, optional): number of random Fourier features (default: 256)
+        seed (int, optional): seed for drawing the random frequencies and phases (default: 0)
+        gpu (bool): if true then all the computation is carried on `GPU` else on `CPU`
+        dtype (torch.dtype, optional): floating point precision of the computation (default: torch.float32)
+        **kwargs: the keyword that stores parameters for HSIC criterion, `sigma` is the bandwidth of the gaussian kernel
+
+    """
+
+    def __init__(
+        self, num_features=256, seed=0, gpu=True, dtype=torch.float32, **kwargs
+    ):
+        super().__init__(gpu, **kwargs)
+        if "sigma" not in self.params_dict.keys():
+            raise Exception("Cannot find argument sigma for the gaussian kernel")
+        self.num_features = num_features
+        self.seed = seed
+        self.dtype = dtype
+        self.projections = {}  # random frequencies and phases for each input dimension
+
+    def get_projection(self, dim):
+        if dim not in self.projections.keys():
+            generator = torch.Generator().manual_seed(self.seed + dim)
+            W = torch.randn(
+                dim, self.num_features, generator=generator, dtype=self.dtype
+            )
+            W = W / self.params_dict["sigma"]
+            b = (2 * math.pi) * torch.rand(
+                self.num_features, generator=generator, dtype=self.dtype
+            )
+            self.projections[dim] = (W.to(self.device), b.to(self.device))
+        return self.projections[dim]
+
+    def features(self, x):
+        """
+        Maps the samples `x` of shape (m, d) to random Fourier features of
+        shape (m, num_features).
+
+        """
+        W, b = self.get_projection(x.shape[1])
+        return math.sqrt(2 / self.num_features) * torch.cos(torch.mm(x, W) + b)
+
+    def criterion(self, x, y):
+        """
+        Defines the approximate HSIC criterion.
+
+        """
+        m = x.shape[0]
+        x = x.to(self.device, self.dtype).reshape(m, -1)
+        y = y.to(self.device, self.dtype).reshape(m, -1)
+        return kernel_module.hsic_features(self.features(x), self.features(y))
+
+
+class NystromHSIC(Estimator):
+    """
+    Approximate HSIC using low-rank Nystrom approximation of the Gram
+    matrices as described in the paper "Using the Nystrom Method to Speed
+    Up Kernel Machines".
+
+    For each variable `num_landmarks` landmark samples are selected and only
+    the (m, r) and (r, r) kernel blocks are computed, so the criterion costs
+    O(m r^2) and no (m, m) matrix is ever created. Landmarks are treated as
+    constants during back-propagation.
+
+
+    Arguments:
+        kernel (str): kernel which is used for calculating kernel blocks, any identifier of :mod:`glow.utils.hsic_utils`
+        num_landmarks (int, optional): number of landmark samples r (default: 256)
+        landmarks (str, optional): 'uniform' for uniform sampling of landmarks without replacement or 'kmeans++' for k-means++ seeding (default: 'uniform')
+        seed (int, optional): seed for the landmark selection (default: 0)
+        gpu (bool): if true then all the computation is carried on `GPU` else on `CPU`
+        dtype (torch.dtype, optional): floating point precision of the computation (default: torch.float32)
+        **kwargs: the keyword that stores parameters for HSIC criterion
+
+    """
+
+    def __init__(
+        self,
+        kernel,
+        num_landmarks=256,
+        landmarks="uniform",
+        seed=0,
+        gpu=True,
+        dtype=torch.float32,
+        **kwargs
+    ):
+        super().__init__(gpu, **kwargs)
+        if landmarks not in ("uniform", "kmeans++"):
+            raise ValueError("Could not interpret " "landmarks identifier:", landmarks)
+        self.kernel = kernel
+        self.num_landmarks = num_landmarks
+        self.landmarks = landmarks
+        self.dtype = dtype
+        self.generator = torch.Generator(device=self.device).manual_seed(seed)
+
+    def select_landmarks(self, x, r):
+        """
+        Selects indices of `r` landmark samples from `x` of shape (m, d).
+
+        """
+        m = x.shape[0]
+        if self.landmarks == "uniform":
+            return torch.randperm(m, generator=self.generator, device=self.device)[:r]
+        # k-means++ seeding, every new landmark is drawn with probability
+        # proportional to the squared distance from the closest landmark
+        indices = torch.randint(m, (1,), generator=self.generator, device=self.device)
+        min_dist = torch.sum((x - x[indices]) ** 2, dim=1)
+        for _ in range(1, r):
+            total = torch.sum(min_dist)
+            if total <= 0:
+                break
+            idx = torch.multinomial(min_dist / total, 1, generator=self.generator)
+            indices = torch.cat([indices, idx])
+            min_dist = torch.min(min_dist, torch.sum((x - x[idx]) ** 2, dim=1))
+        return indices
+
+    def features(self, x):
+        """
+        Maps the samples `x` of shape (m, d) to Nystrom features `phi` of
+        shape (m, r) with `phi phi^T` approximating the Gram matrix of `x`.
+
+        """
+        kernel = kernel_module.get(self.kernel)
+        r = min(self.num_landmarks, x.shape[0])
+        z = x[self.select_landmarks(x.detach(), r)].detach()
+        C = kernel(x, z, self.params_dict)
+        W = kernel(z, z, self.params_dict)
+        eigvals, eigvecs = torch.linalg.eigh(W)
+        keep = eigvals > eigvals.max() * torch.finfo(W.dtype).eps * r
+        return torch.mm(C, eigvecs[:, keep] / torch.sqrt(eigvals[keep]))
+
+    def criterion(self, x, y):
+        """
+        Defines the approximate HSIC criterion.
+
+        """
         m = x.shape[0]
-        K_x = kernel_module.get(self.kernel)(x, x, self.params_dict)
-        K_y = kernel_module.get(self.kernel)(y, y, self.params_dict)
-        H = torch.eye(m, m) - (1 / m) * torch.ones(m, m)
-        H = H.to(self.device)
-        matrix_x = torch.mm(K_x, H)
-        matrix_y = torch.mm(K_y, H)
-        return (1 / (m - 1)) * torch.trace(torch.mm(matrix_x, matrix_y))
+        x = x.to(self.device, self.dtype).reshape(m, -1)
+        y = y.to(self.device, self.dtype).reshape(m, -1)
+        return kernel_module.hsic_features(self.features(x), self.features(y))
+
+
+class MultiSigmaHSIC(HSIC):
+    """
+    HSIC with gaussian kernel evaluated for several bandwidths at once to
+    capture dependence at various scales.
+
+    The squared distances of a variable are computed once and the kernels
+    for all the bandwidths are obtained by a single batched exponential over
+    a (S, m, m) tensor, so the criterion returns a tensor of shape (S,).
+    The evaluated dynamics of a model hold every bandwidth as a separate
+    evaluator entry, see :class:`glow.models.IBSequential`.
+
+
+    Arguments:
+        sigmas (iterable): bandwidths of the gaussian kernel
+        gpu (bool): if true then all the computation is carried on `GPU` else on `CPU`
+        estimate (str, optional): 'biased' or 'unbiased' HSIC estimate (default: 'biased')
+        dtype (torch.dtype, optional): floating point precision in which Gram matrices are computed (default: torch.float32)
+        num_classes (int, optional): number of classes of categorical targets (default: None)
+        **kwargs: the keyword that stores parameters for HSIC criterion
+
+    """
+
+    def __init__(
+        self,
+        sigmas,
+        gpu=True,
+        estimate="biased",
+        dtype=torch.float32,
+        num_classes=None,
+        **kwargs
+    ):
+        super().__init__("gaussian", gpu, estimate, dtype, num_classes, **kwargs)
+        self.sigmas = [float(sigma) for sigma in sigmas]
+        self.scales = torch.tensor(
+            [-1 / (2 * (sigma ** 2)) for sigma in self.sigmas], dtype=dtype
+        ).to(self.device)
+
+    def gram(self, x):
+        """
+        Computes the stack of Gram matrices of `x` of shape (S, m, m) for all
+        the bandwidths, shared through the active
+        :class:`glow.utils.hsic_utils.GramCache` if any.
+
+        """
+        if self.is_categorical(x):
+            return super().gram(x)
+
+        def compute_distances():
+            t = x.to(self.device, self.dtype)
+            return kernel_module.squared_distances(
+                t, t, self.params_dict.get("max_memory")
+            )
+
+        def compute():
+            tag = ("squared_distances", self.dtype, self.device)
+            D = kernel_module.cached(x, tag, self.params_dict, compute_distances)
+            return torch.exp(self.scales.view(-1, 1, 1) * D.unsqueeze(0))
+
+        return kernel_module.cached(x, self.kernel_tag(), self.params_dict, compute)
+
+    def label_kernel_values(self):
+        return torch.ones_like(self.scales), torch.exp(2 * self.scales)
+
+    def kernel_tag(self):
+        return ("gram", "multi_sigma", tuple(self.sigmas), self.dtype, self.device)
+
+    def eval_dynamics_segment(self, dynamics_segment):
+        """
+        Process smallest segment of dynamics and calculate coordinates for
+        every bandwidth.
+
+
+        Arguments:
+            dynamics_segment (iterable): smallest segment of the dynamics of a batch containing input, hidden layer output and label in form of :class:`torch.Tensor` objects
+
+        Returns:
+            (iterable): list with one list of coordinates (as returned by :meth:`Estimator.eval_dynamics_segment`) for each bandwidth in `sigmas`
+
+        """
+        coordinates = self.hsic_coordinates(dynamics_segment)
+        return [
+            [[c[0], c[1]] for c in sigma_coordinates]
+            for sigma_coordinates in coordinates
+        ]
+
+
+class MatrixRenyi(HSIC):
+    """
+    Mutual information from the matrix-based Renyi alpha-entropy of
+    normalized Gram matrices as proposed in the paper "Measures of Entropy
+    from Data Using Infinitely Divisible Kernels",
+    `S(A) = log2(tr(A^alpha)) / (1 - alpha)` with `A = K / tr(K)`, and
+    `I(X; Y) = S(A_x) + S(A_y) - S(A_xy)` where the joint matrix `A_xy` is the
+    normalized Hadamard product of `A_x` and `A_y`. Kernels and Gram matrices
+    are the ones of :class:`HSIC` (and shared with it through the Gram
+    cache), alpha equal to 1 gives the von Neumann (Shannon) entropy.
+
+    The trace `tr(A^alpha)` is computed from the eigenvalues of `A` for
+    small batches. For larger batches the `rank` dominant eigenvalues are
+    obtained by subspace iteration and the trace of the remainder is
+    estimated with stochastic Lanczos quadrature using `num_probes`
+    Rademacher probes, which are processed together, and `num_steps` Lanczos
+    steps with full reorthogonalization, costing
+    O((rank + num_steps * num_probes) * m^2) instead of O(m^3). For alpha
+    equal to 2 the trace is computed exactly as `sum(A * A)`. On a single
+    CPU core at m=2048 the criterion with the default settings is about 7-9
+    times faster than the exact computation for alpha between 1 and 1.5, and
+    12-16 times for alpha equal to 2, as the cost of building the Gram
+    matrices is shared by both.
+
+
+    Arguments:
+        kernel (str): kernel which is used for calculating the Gram matrices
+        alpha (float, optional): order of the Renyi entropy (default: 1.01)
+        method (str, optional): 'exact' for the eigenvalue computation, 'stochastic' for trace estimation or 'auto' for the exact computation when the batch has at most `exact_size` samples (default: 'auto')
+        exact_size (int, optional): largest batch size for which 'auto' computes the eigenvalues (default: 512)
+        rank (int, optional): number of dominant eigenvalues computed by subspace iteration in the stochastic method (default: 64)
+        num_probes (int, optional): number of random probe vectors of the trace estimate (default: 8)
+        num_steps (int, optional): number of Lanczos steps per probe (default: 6)
+        seed (int, optional): seed for drawing the random subspace and probe vectors, the same ones are used for every call (default: 0)
+        gpu (bool): if true then all the computation is carried on `GPU` else on `CPU`
+        dtype (torch.dtype, optional): floating point precision in which Gram matrices are computed, `torch.float32` or `torch.float64` (default: torch.float32)
+        num_classes (int, optional): number of classes of categorical targets, if given then integer valued targets are treated as class labels (default: None)
+        **kwargs: the keyword that stores parameters for the kernel
+
+    """
+
+    def __init__(
+        self,
+        kernel,
+        alpha=1.01,
+        method="auto",
+        exact_size=512,
+        rank=64,
+        num_probes=8,
+        num_steps=6,
+        seed=0,
+        gpu=True,
+        dtype=torch.float32,
+        num_classes=None,
+        **kwargs
+    ):
+        super().__init__(kernel, gpu, "biased", dtype, num_classes, **kwargs)
+        if method not in ("auto", "exact", "stochastic"):
+            raise ValueError("Could not interpret " "trace method:", method)
+        if alpha <= 0:
+            raise ValueError("Renyi entropy requires alpha > 0")
+        self.alpha = alpha
+        self.method = method
+        self.exact_size = exact_size
+        self.rank = rank
+        self.num_probes = num_probes
+        self.num_steps = num_steps
+        self.seed = seed
+
+    def spectral_function(self, eigenvalues):
+        """
+        Function of the eigenvalues whose sum is `tr(A^alpha)`, or the von
+        Neumann entropy in nats when alpha is 1.
+
+        """
+        eigenvalues = eigenvalues.clamp_min(0)
+        if self.alpha == 1:
+            return torch.special.entr(eigenvalues)
+        return eigenvalues ** self.alpha
+
+    def dominant_subspace(self, A):
+        """
+        Orthonormal basis Q of shape (m, rank) of the dominant eigenspace of
+        `A` obtained with two steps of subspace iteration, along with the
+        projection `Q^T A Q` which is formed from the last product with `A`.
+
+        """
+        generator = torch.Generator().manual_seed(self.seed)
+        omega = torch.randn(A.shape[0], self.rank, generator=generator)
+        AQ = torch.mm(A, omega.to(A))
+        for _ in range(2):
+            Q, _ = torch.linalg.qr(AQ)
+            AQ = torch.mm(A, Q)
+        return Q, torch.mm(Q.t(), AQ)
+
+    def lanczos(self, matvec, Z):
+        """
+        Stochastic Lanczos quadrature of the traces of the
+        :meth:`spectral_function` and of the symmetric operator `matvec` with
+        the columns of `Z` as probes, all the probes run the Lanczos iteration
+        together.
+
+        """
+        m, num_probes = Z.shape
+        num_steps = min(self.num_steps, m)
+        Q = torch.zeros(num_steps, m, num_probes, dtype=Z.dtype, device=Z.device)
+        alphas = torch.zeros(num_steps, num_probes, dtype=Z.dtype, device=Z.device)
+        betas = torch.zeros(num_steps - 1, num_probes, dtype=Z.dtype, device=Z.device)
+        probe_norm = torch.norm(Z, dim=0)
+        q = Z / torch.where(probe_norm > 0, probe_norm, torch.ones_like(probe_norm))
+        eps = m * torch.finfo(Z.dtype).eps
+        for j in range(num_steps):
+            Q[j] = q
+            w = matvec(q)
+            alphas[j] = torch.sum(q * w, dim=0)
+            # full reorthogonalization against all the Lanczos vectors
+            basis = Q[: j + 1]
+            w = w - torch.einsum(
+                "jmp,jp->mp", basis, torch.einsum("jmp,mp->jp", basis, w)
+            )
+            if j < num_steps - 1:
+                beta = torch.norm(w, dim=0)
+                # the Krylov space is exhausted, the rest of T is decoupled
+                scale = torch.max(torch.abs(alphas[: j + 1]), dim=0).values
+                beta = torch.where(beta > eps * scale, beta, torch.zeros_like(beta))
+                betas[j] = beta
+                q = w / torch.where(beta > 0, beta, torch.ones_like(beta))
+        T = torch.diag_embed(alphas.t())
+        T = T + torch.diag_embed(betas.t(), 1) + torch.diag_embed(betas.t(), -1)
+        theta, U = torch.linalg.eigh(T.double())
+        weights = probe_norm.double().unsqueeze(1) ** 2 * U[:, 0, :] ** 2
+        trace = torch.mean(torch.sum(weights * self.spectral_function(theta), dim=1))
+        return trace, torch.mean(torch.sum(weights * theta, dim=1))
+
+    def stochastic_trace(self, A):
+        """
+        Estimate of the trace of the :meth:`spectral_function` of `A`. The
+        dominant eigenvalues are computed from the projection of `A` on its
+        dominant subspace and the trace of the remainder is estimated with
+        stochastic Lanczos quadrature on the probes projected out of that
+        subspace. The estimate of the remainder is rescaled by the ratio of
+        the exact trace of the remainder of `A` to its estimate with the same
+        probes, which cancels most of the variance of the probes.
+
+        """
+        m = A.shape[0]
+        Q, B = self.dominant_subspace(A)
+        trace = torch.sum(self.spectral_function(torch.linalg.eigvalsh(B.double())))
+        remainder = (torch.trace(A) - torch.trace(B)).double()
+
+        def project(V):
+            return V - torch.mm(Q, torch.mm(Q.t(), V))
+
+        generator = torch.Generator().manual_seed(self.seed)
+        Z = torch.randint(0, 2, (m, self.num_probes), generator=generator)
+        Z = project((2 * Z - 1).to(A))
+        estimate, remainder_estimate = self.lanczos(
+            lambda V: project(torch.mm(A, V)), Z
+        )
+        if remainder_estimate > 0:
+            estimate = estimate * remainder.clamp_min(0) / remainder_estimate
+        return trace + estimate
+
+    def entropy(self, A):
+        """
+        Renyi alpha-entropy in bits of the normalized Gram matrix `A`.
+
+        """
+        m = A.shape[0]
+        exact = self.method == "exact" or (
+            self.method == "auto" and m <= self.exact_size
+        )
+        if exact:
+            eigenvalues = torch.linalg.eigvalsh(A.double())
+            trace = torch.sum(self.spectral_function(eigenvalues))
+        elif self.alpha == 2:
+            trace = torch.sum(A * A).double()
+        else:
+            trace = self.stochastic_trace(A)
+        if self.alpha == 1:
+            return (trace / math.log(2)).float()
+        return (torch.log2(trace) / (1 - self.alpha)).float()
+
+    def normalized_gram(self, x):
+        K = self.gram(x)
+        return K / torch.trace(K)
+
+    def joint_entropy(self, A_x, A_y):
+        A_xy = A_x * A_y
+        return self.entropy(A_xy / torch.trace(A_xy))
+
+    def criterion(self, x, y):
+        """
+        Defines the matrix-based Renyi estimate of mutual information.
+
+        """
+        A_x, A_y = self.normalized_gram(x), self.normalized_gram(y)
+        return self.entropy(A_x) + self.entropy(A_y) - self.joint_entropy(A_x, A_y)
+
+    def eval_dynamics_segment(self, dynamics_segment):
+        """
+        Process smallest segment of dynamics and calculate coordinates, the
+        entropies of the input and label are computed only once for all the
+        layers.
+
+
+        Arguments:
+            dynamics_segment (iterable): smallest segment of the dynamics of a batch containing input, hidden layer output and label in form of :class:`torch.Tensor` objects
+
+        Returns:
+            (iterable): list of calculated coordinates according to the criterion with length equal to 'len(dynamics_segment)-2'
+
+        """
+        segment_size = len(dynamics_segment)
+        A_x = self.normalized_gram(dynamics_segment[0])
+        A_y = self.normalized_gram(dynamics_segment[segment_size - 1])
+        S_x, S_y = self.entropy(A_x), self.entropy(A_y)
+        output_segment = []
+        for idx in range(1, segment_size - 1):
+            A_h = self.normalized_gram(dynamics_segment[idx])
+            S_h = self.entropy(A_h)
+            output_segment.append(
+                [
+                    S_h + S_x - self.joint_entropy(A_h, A_x),
+                    S_h + S_y - self.joint_entropy(A_h, A_y),
+                ]
+            )
+        return output_segment
@@ -12,7 +12,8 @@ def NLLLoss(y_pred, y_true):
 
 
 def HSICLoss(z, x, y, estimator, regularize_coeff):
-    y = one_hot(y, num_classes=-1).float()
+    if not isinstance(estimator, HSIC) or estimator.num_classes is None:
+        y = one_hot(y, num_classes=-1).float()
     loss_1 = estimator.criterion(z, x)
     loss_2 = estimator.criterion(z, y)
     return loss_1 - regularize_coeff * loss_2
@@ -7,7 +7,9 @@ import glow.tensor_numpy_adapter as tensor_numpy_adapter
 import matplotlib.pyplot as plt
 import glow.dynamics as dynamics_module
 import glow.metrics as metric_module
+from glow.utils.quantile_sketch import ActivationSketches
 from tqdm import tqdm
+import tempfile
 import numpy as np
 
 
@@ -45,6 +47,15 @@ class Network(nn.Module):
         self.is_gpu = gpu
         self.device = device
         self.track_dynamics = track_dynamics
+        self.accumulate_dynamics = False
+        self.activation_sketches = None
+        self.async_dynamics = False
+        self.evaluator_workers = 1
+        self.parallel_evaluator = None
+        self.tracking_schedule = None
+        self.dynamics_store = None
+        self.save_activations = False
+        self.collect_dynamics = True  # false for batches skipped by the schedule
 
     def add(self, layer_obj):
         """
@@ -93,10 +104,13 @@ class Network(nn.Module):
         for layer in layers:
             h = layer(h)
             with torch.no_grad():
-                if self.track_dynamics:
+                if self.track_dynamics and self.collect_dynamics:
                     t = h.detach()
                     hidden_outputs.append(t)
             iter_num += 1
+        # only the tracked training batches are summarized by the sketches
+        if self.activation_sketches is not None and self.training and hidden_outputs:
+            self.activation_sketches.update(hidden_outputs)
         return h, hidden_outputs
 
     def compile(
@@ -169,8 +183,13 @@ class Network(nn.Module):
 
     def evaluate_dynamics(self):
         evaluators = self.evaluator_list
+        if self.evaluator_workers > 1 and len(evaluators) > 1:
+            if self.parallel_evaluator is None:
+                self.parallel_evaluator = dynamics_module.ParallelEvaluator(
+                    self.evaluator_workers
+                )
+            return self.parallel_evaluator.evaluate(self.dynamics_handler, evaluators)
         evaluated_dynamics = []
-        # ** NOTE - This can be done in parallel !
         for evaluator in evaluators:
             evaluated_dynamics.append(self.dynamics_handler.evaluate(evaluator))
         return evaluated_dynamics
@@ -182,6 +201,22 @@ class Network(nn.Module):
         val_len = len(val_loader)
         metric_dict = self.handle_metrics(self.metrics)
         epoch_collector = []
+        variance_collector = []
+        step_collector = []
+        global_step = 0
+        schedule = self.tracking_schedule
+        store = self.dynamics_store if self.track_dynamics else None
+        if store is not None:
+            store.start_run()
+        async_handler = None
+        if self.async_dynamics and self.track_dynamics and self.evaluator_list:
+            async_handler = dynamics_module.AsyncDynamics(
+                self.evaluator_list,
+                self.async_workers,
+                self.max_pending,
+                self.activation_sketches,
+                self.evaluator_workers,
+            )
         for epoch in range(num_epochs):
             # training loop
             print("\n")
@@ -190,15 +225,55 @@ class Network(nn.Module):
             print("Training loop: ")
             pbar = tqdm(total=train_len)
             batch_collector = []
-            for x, y in train_loader:
+            epoch_steps = []  # global steps tracked in this epoch
+            deferred = []  # (step, evaluated dynamics) collected at the epoch end
+            if schedule is not None:
+                schedule.start_epoch(train_len)
+            accumulators = []  # one per expanded evaluator entry
+
+            def collect(step, evaluated_dynamics_segment):
+                evaluated_dynamics_segment = dynamics_module.expand(
+                    evaluated_dynamics_segment
+                )
+                if store is not None:
+                    store.add_coordinates(epoch, step, evaluated_dynamics_segment)
+                if self.accumulate_dynamics:
+                    for idx, evaluated_segment in enumerate(evaluated_dynamics_segment):
+                        if idx == len(accumulators):
+                            accumulators.append(dynamics_module.StreamingAccumulator())
+                        accumulators[idx].update(evaluated_segment)
+                elif store is None:
+                    batch_collector.append(evaluated_dynamics_segment)
+
+            for batch, (x, y) in enumerate(train_loader):
                 x, y = x.to(self.device), y.to(self.device)
+                tracked = self.track_dynamics and len(self.evaluator_list) > 0
+                if tracked and schedule is not None:
+                    tracked = schedule.scheduled(global_step, batch)
+                self.collect_dynamics = tracked
                 self.optimizer.zero_grad()
                 y_pred, dynamics_segment = self.forward(x)
                 dynamics_segment = [x] + dynamics_segment
-                if self.track_dynamics and len(self.evaluator_list) > 0:
-                    self.dynamics_handler = dynamics_module.get(dynamics_segment)
+                if tracked:
+                    epoch_steps.append(global_step)
+                if tracked and store is not None and self.save_activations:
+                    store.add_activations(epoch, global_step, dynamics_segment)
+                if tracked and async_handler is not None:
+                    # evaluated in the background, collected at the epoch end
+                    async_handler.submit(dynamics_segment)
+                elif tracked:
+                    self.dynamics_handler = dynamics_module.get(
+                        dynamics_segment, self.activation_sketches
+                    )
                     evaluated_dynamics_segment = self.evaluate_dynamics()
-                    batch_collector.append(evaluated_dynamics_segment)
+                    self.dynamics_handler.release()
+                    if schedule is not None and schedule.mode == "reservoir":
+                        deferred.append((global_step, evaluated_dynamics_segment))
+                        kept = set(schedule.kept(epoch_steps))
+                        deferred = [d for d in deferred if d[0] in kept]
+                    else:
+                        collect(global_step, evaluated_dynamics_segment)
+                global_step += 1
 
                 loss = self.criterion(y_pred, y)
                 loss.backward()
@@ -240,16 +315,59 @@ class Network(nn.Module):
                 val_losses.append(val_loss / val_len)
                 epochs.append(epoch + 1)
                 self.train()
+            self.collect_dynamics = True
+            if async_handler is not None:
+                deferred = list(zip(epoch_steps, async_handler.drain()))
+            if schedule is not None:
+                epoch_steps = schedule.kept(epoch_steps)
+            kept = set(epoch_steps)
+            for step, evaluated_dynamics_segment in deferred:
+                if step in kept:
+                    collect(step, evaluated_dynamics_segment)
+            if store is not None:
+                store.end_epoch(epoch_steps)
+            step_collector.append(epoch_steps)
             if self.track_dynamics:
-                epoch_collector.append(batch_collector)
-
+                if self.accumulate_dynamics:
+                    epoch_collector.append(
+                        [a.estimate().cpu().numpy() for a in accumulators]
+                    )
+                    variance_collector.append(
+                        [a.variance().cpu().numpy() for a in accumulators]
+                    )
+                elif store is None:
+                    epoch_collector.append(batch_collector)
+
+        if async_handler is not None:
+            async_handler.close()
+        if self.parallel_evaluator is not None:
+            self.parallel_evaluator.close()
+            self.parallel_evaluator = None
+        if self.track_dynamics and epoch_collector:
+            self.evaluated_dynamics = self.stack_epochs(epoch_collector)
         if self.track_dynamics:
-            self.evaluated_dynamics = np.array(epoch_collector)
+            self.evaluated_steps = self.stack_epochs(step_collector)
+            if self.accumulate_dynamics:
+                self.evaluated_dynamics_variance = np.array(variance_collector)
 
         # plot the loss vs epoch graphs
         if show_plot:
             self.plot_loss(epochs, train_losses, val_losses)
 
+    def stack_epochs(self, epoch_collector):
+        """
+        Stacks per-epoch lists into a :class:`numpy.ndarray`, an object array
+        with one entry per epoch is returned if the epochs have different
+        number of entries (for example with a tracking schedule).
+
+        """
+        if len({len(collected) for collected in epoch_collector}) <= 1:
+            return np.array(epoch_collector)
+        stacked = np.empty(len(epoch_collector), dtype=object)
+        for idx, collected in enumerate(epoch_collector):
+            stacked[idx] = np.array(collected)
+        return stacked
+
     def fit(
         self,
         x_train,
@@ -334,24 +452,57 @@ class IBSequential(Network):
         input_shape (tuple): input tensor shape
         gpu (bool, optional): if true then PyGlow will attempt to use `GPU`, for false `CPU` will be used (default: False)
         track_dynamics (bool): if true then will track the input-hidden-output dynamics segment and will allow evaluator to attach to the model, for false no track for dynamics is kept
-        save_dynamics (bool, optional): if true then saves the whole training process dynamics into a distributed file (for efficiency)
+        save_dynamics (bool, optional): if true then saves the whole training process dynamics into a chunked on-disk store under `dynamics_path` instead of keeping the coordinates of every batch in memory, see :class:`glow.dynamics.DynamicsStore` (default: False)
+        dynamics_path (str, optional): directory of the dynamics store for save_dynamics=True, a new temporary directory if None (default: None)
+        append_dynamics (bool, optional): if true then the dynamics are appended to an existing store in `dynamics_path`, else the directory must be empty or missing (default: False)
+        save_activations (bool, optional): if true then the raw tracked dynamics segments are saved into the store as well (default: False)
+        accumulate_dynamics (bool, optional): if true then the coordinates of every batch are folded into a streaming block estimate per epoch instead of being kept for every batch (default: False)
+        sketch_activations (bool, optional): if true then keeps a streaming quantile sketch of every neuron of the tracked layers which is used by the binning estimators for adaptive bin edges (default: False)
+        sketch_size (int, optional): capacity `k` of the quantile sketches, the memory is constant in the number of batches (default: 200)
+        async_dynamics (bool, optional): if true then the dynamics segments are evaluated by background threads while the training continues and are collected in order at the end of every epoch (default: False)
+        async_workers (int, optional): number of background threads for async_dynamics=True (default: 1)
+        max_pending (int, optional): maximum number of dynamics segments waiting for evaluation, the training blocks when it is reached (default: 8)
+        evaluator_workers (int, optional): number of threads running the attached evaluators on a dynamics segment at once, the intra-op threads of torch are split between them, with async_dynamics=True the pool is shared by the background threads (default: 1)
+        tracking_schedule (glow.dynamics.TrackingSchedule, optional): schedule of the batches whose dynamics are tracked, the hidden outputs of the other batches are not even collected, every batch is tracked if None (default: None)
 
     Attributes:
         evaluator_list (iterable): list of :class:`glow.information_bottleneck.Estimator` instances which stores the evaluators for the model
         evaluated_dynamics (iterable): list of evaluated dynamics segment information coordinates for intermediate layer for each evaluator averaged over batch for each epoch
+        evaluated_dynamics_variance (iterable): variance of the block estimates in `evaluated_dynamics`, only available for accumulate_dynamics=True
+        activation_sketches (glow.utils.quantile_sketch.ActivationSketches): streaming quantile sketches of the tracked layers over all training batches, only available for sketch_activations=True
+        dynamics_store (glow.dynamics.DynamicsStore): on-disk store of the coordinates of every tracked batch, only available for save_dynamics=True in which case `evaluated_dynamics` is only set for accumulate_dynamics=True
+        evaluated_steps (iterable): global training steps (batches counted from the start of training) whose dynamics were evaluated for each epoch, aligned with the batches of `evaluated_dynamics`
 
     Shape:
-        evaluator_list has shape (N, E, L, 2) where:
+        evaluated_dynamics has shape (N, B, E, L, 2), or (N, E, L, 2) for accumulate_dynamics=True, where:
             - N: Number of epochs
-            - E: Number of evaluators
+            - B: Number of tracked batches of an epoch
+            - E: Number of evaluators, every bandwidth of :class:`glow.information_bottleneck.MultiSigmaHSIC` counts as a separate evaluator in the order of its `sigmas`
             - L: Number of layers with parameters (Flatten and Dropout excluded)
 
         and last dimension is equal to 2 which stores 2-D information plane coordinates
 
+        evaluated_steps has shape (N, B) where B is the number of tracked batches of an epoch
+
     """
 
     def __init__(
-        self, input_shape, gpu=False, track_dynamics=False, save_dynamics=False
+        self,
+        input_shape,
+        gpu=False,
+        track_dynamics=False,
+        save_dynamics=False,
+        dynamics_path=None,
+        append_dynamics=False,
+        save_activations=False,
+        accumulate_dynamics=False,
+        sketch_activations=False,
+        sketch_size=200,
+        async_dynamics=False,
+        async_workers=1,
+        max_pending=8,
+        evaluator_workers=1,
+        tracking_schedule=None,
     ):
         if gpu:
             if torch.cuda.is_available():
@@ -364,3 +515,22 @@ class IBSequential(Network):
             print("Running on CPU device !")
         super().__init__(input_shape, device, gpu, track_dynamics)
         self.evaluator_list = []  # collect all the evaluators
+        self.accumulate_dynamics = accumulate_dynamics
+        if sketch_activations:
+            if not track_dynamics:
+                raise Exception("Cannot sketch activations for track_dynamics=False")
+            self.activation_sketches = ActivationSketches(sketch_size)
+        self.async_dynamics = async_dynamics
+        self.async_workers = async_workers
+        self.max_pending = max_pending
+        self.evaluator_workers = evaluator_workers
+        self.tracking_schedule = tracking_schedule
+        if save_dynamics:
+            if not track_dynamics:
+                raise Exception("Cannot save dynamics for track_dynamics=False")
+            if dynamics_path is None:
+                dynamics_path = tempfile.mkdtemp(prefix="glow-dynamics-")
+            self.dynamics_store = dynamics_module.DynamicsStore(
+                dynamics_path, append=append_dynamics
+            )
+        self.save_activations = save_activations
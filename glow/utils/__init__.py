@@ -1,2 +1,3 @@
 from .optimizers import Optimizers
 from . import hsic_utils
+from . import quantile_sketch
@@ -1,27 +1,12 @@
-import torch
-
-
-def floor_hash(x, epsilon, b):
-    return torch.floor((1 / epsilon) * (x + b))
-
-
-def get(identifier, params_dict):
-    if identifier == "floor_hash":
-
-        def curry_func(x):
-            if "epsilon" in params_dict.keys():
-                epsilon = params_dict["epsilon"]
-            else:
-                raise Exception(
-                    "Cannot find argument epsilon for hash function floor_hash"
-                )
-
-            if "b" in params_dict.keys():
-                b = params_dict["b"]
-            else:
-                raise Exception("Cannot find argument b for hash function floor_hash")
-            return floor_hash(x, epsilon, b)
-
-        return curry_func
-    else:
-        raise ValueError("Could not interpret " "hash function identifier:", identifier)
+# hash functions live in glow.hash_functions, re-exported here for
+# backward compatibility
+from glow.hash_functions import floor_hash
+from glow.hash_functions import pack_codes
+from glow.hash_functions import enumerate_buckets
+from glow.hash_functions import enumerate_rows
+from glow.hash_functions import ensemble_floor_hash
+from glow.hash_functions import floor_hash_states
+from glow.hash_functions import PStableHash
+from glow.hash_functions import SignHash
+from glow.hash_functions import MultiTableHash
+from glow.hash_functions import get
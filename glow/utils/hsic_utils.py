@@ -1,22 +1,415 @@
+import threading
 import torch
 from torch import nn
 
 
-def gaussian_kernel(x, y, params_dict):
-    if "sigma" in params_dict.keys():
-        sigma = params_dict["sigma"]
+def _get_param(params_dict, name, kernel):
+    if name in params_dict.keys():
+        return params_dict[name]
+    else:
+        raise Exception(
+            "Cannot find argument " + name + " for the " + kernel + " kernel"
+        )
+
+
+def pairwise(x, y, transform, distances=True, max_memory=None):
+    """
+    Distance engine shared by all the kernels. Computes `transform` of the
+    pairwise squared euclidean distances (or of the inner products) between
+    the rows of `x` and `y` using the Gram trick
+    `|x|^2 + |y|^2 - 2 x y^T`, so that no (m, n, d) difference tensor is
+    ever created.
+
+    If `max_memory` is given then the output is computed in tiles of rows so
+    that the temporaries of one tile stay within `max_memory` bytes. When `x`
+    is `y` only the upper triangular tiles are computed and mirrored.
+
+
+    Arguments:
+        x (torch.Tensor): first set of samples of shape (m, d)
+        y (torch.Tensor): second set of samples of shape (n, d)
+        transform (callable): elementwise function applied to the distances or inner products
+        distances (bool, optional): if true then `transform` is applied on squared distances else on inner products (default: True)
+        max_memory (int, optional): budget in bytes for the temporaries of one tile, no tiling if None (default: None)
+
+    Returns:
+        (torch.Tensor): transformed pairwise matrix of shape (m, n)
+
+    """
+    symmetric = x is y
+    if not x.is_floating_point():
+        x = x.float()
+    if symmetric:
+        y = x
+    elif not y.is_floating_point():
+        y = y.float()
+    m, n = x.shape[0], y.shape[0]
+    x = x.reshape(m, -1)
+    y = y.reshape(n, -1)
+    if distances:
+        x_norm = torch.sum(x * x, dim=1)
+        y_norm = x_norm if symmetric else torch.sum(y * y, dim=1)
+
+    def block(start, stop, col_start):
+        G = torch.mm(x[start:stop], y[col_start:].t())
+        if distances:
+            G = x_norm[start:stop].unsqueeze(1) + y_norm[col_start:] - 2 * G
+            G = G.clamp_min(0)
+        return transform(G)
+
+    if max_memory is None:
+        rows = m
     else:
-        raise Exception("Cannot find argument sigma for the gaussian kernel")
-    m = x.shape[0]
-    vec_dim = x.shape[1]
-    x = x.view(m, 1, vec_dim)
-    y = y.view(m, vec_dim)
-    z = (x - y).float()
-    return torch.exp((-1 / (2 * (sigma ** 2))) * (torch.norm(z, dim=2) ** 2))
+        rows = max(1, int(max_memory // (3 * n * x.element_size())))
+    if rows >= m:
+        return block(0, m, 0)
+
+    output = x.new_empty(m, n)
+    for start in range(0, m, rows):
+        stop = min(start + rows, m)
+        if symmetric:
+            tile = block(start, stop, start)
+            output[start:stop, start:] = tile
+            output[stop:, start:stop] = tile[:, stop - start :].t()
+        else:
+            output[start:stop] = block(start, stop, 0)
+    return output
+
+
+def squared_distances(x, y, max_memory=None):
+    """
+    Pairwise squared euclidean distances between the rows of `x` and `y`
+    computed by the distance engine :func:`pairwise`.
+
+    """
+    return pairwise(x, y, lambda D: D, max_memory=max_memory)
+
+
+def gaussian_kernel(x, y, params_dict):
+    sigma = _get_param(params_dict, "sigma", "gaussian")
+    return pairwise(
+        x,
+        y,
+        lambda D: torch.exp((-1 / (2 * (sigma ** 2))) * D),
+        max_memory=params_dict.get("max_memory"),
+    )
+
+
+def laplacian_kernel(x, y, params_dict):
+    sigma = _get_param(params_dict, "sigma", "laplacian")
+    # distances are clamped away from zero to keep the gradient of sqrt finite
+    return pairwise(
+        x,
+        y,
+        lambda D: torch.exp(
+            (-1 / sigma) * torch.sqrt(D.clamp_min(torch.finfo(D.dtype).tiny))
+        ),
+        max_memory=params_dict.get("max_memory"),
+    )
+
+
+def inverse_multiquadric_kernel(x, y, params_dict):
+    sigma = _get_param(params_dict, "sigma", "inverse_multiquadric")
+    return pairwise(
+        x,
+        y,
+        lambda D: torch.rsqrt(1 + D / (sigma ** 2)),
+        max_memory=params_dict.get("max_memory"),
+    )
+
+
+def linear_kernel(x, y, params_dict):
+    return pairwise(
+        x, y, lambda G: G, distances=False, max_memory=params_dict.get("max_memory")
+    )
+
+
+def polynomial_kernel(x, y, params_dict):
+    degree = _get_param(params_dict, "degree", "polynomial")
+    c = params_dict.get("c", 1)
+    return pairwise(
+        x,
+        y,
+        lambda G: (G + c) ** degree,
+        distances=False,
+        max_memory=params_dict.get("max_memory"),
+    )
 
 
 def get(kernel):
     if kernel == "gaussian":
         return gaussian_kernel
+    elif kernel == "laplacian":
+        return laplacian_kernel
+    elif kernel == "inverse_multiquadric":
+        return inverse_multiquadric_kernel
+    elif kernel == "linear":
+        return linear_kernel
+    elif kernel == "polynomial":
+        return polynomial_kernel
     else:
         raise ValueError("Could not interpret " "kernel function identifier:", kernel)
+
+
+def center(K, inplace=False):
+    """
+    Double centers the Gram matrix `K`, that is computes `H K H` with
+    `H = I - (1/m) 1 1^T`, by subtracting row and column means instead of
+    multiplying with the dense centering matrix.
+
+    Leading dimensions of `K` are treated as batch dimensions.
+
+
+    Arguments:
+        K (torch.Tensor): Gram matrix (or stack of Gram matrices) of shape (..., m, m)
+        inplace (bool, optional): if true then `K` is overwritten with its centered form, must not be used on tensors which are needed for back-propagation (default: False)
+
+    Returns:
+        (torch.Tensor): centered Gram matrix with same shape as `K`
+
+    """
+    row_mean = K.mean(dim=-1, keepdim=True)
+    col_mean = K.mean(dim=-2, keepdim=True)
+    total_mean = row_mean.mean(dim=-2, keepdim=True)
+    if inplace:
+        return K.sub_(row_mean).sub_(col_mean).add_(total_mean)
+    return K - row_mean - col_mean + total_mean
+
+
+def hsic_biased(K_x, K_y):
+    """
+    Biased HSIC estimate `tr(K_x H K_y H) / (m - 1)` computed in O(m^2) as
+    elementwise sum of the centered `K_x` with `K_y`.
+
+    Leading dimensions of the Gram matrices are treated as batch dimensions.
+
+    """
+    m = K_x.shape[-1]
+    return torch.sum(center(K_x) * K_y, dim=(-2, -1)) / (m - 1)
+
+
+def hsic_unbiased(K_x, K_y):
+    """
+    Unbiased HSIC estimate as proposed in the paper "Feature Selection via
+    Dependence Maximization" (Song et al.) computed in O(m^2).
+
+    Leading dimensions of the Gram matrices are treated as batch dimensions.
+
+    """
+    m = K_x.shape[-1]
+    if m < 4:
+        raise Exception("Unbiased HSIC estimate requires at least 4 samples")
+    K = K_x.clone()
+    L = K_y.clone()
+    K.diagonal(dim1=-2, dim2=-1).zero_()
+    L.diagonal(dim1=-2, dim2=-1).zero_()
+    row_K = torch.sum(K, dim=-1)
+    row_L = torch.sum(L, dim=-1)
+    sum_K = torch.sum(row_K, dim=-1)
+    sum_L = torch.sum(row_L, dim=-1)
+    trace_KL = torch.sum(K * L, dim=(-2, -1))
+    cross_KL = torch.sum(row_K * row_L, dim=-1)
+    return (
+        trace_KL + sum_K * sum_L / ((m - 1) * (m - 2)) - (2 / (m - 2)) * cross_KL
+    ) / (m * (m - 3))
+
+
+def hsic_labels(K_x, labels, num_classes):
+    """
+    Biased HSIC estimate between `K_x` and the label kernel which is 1 for
+    samples of the same class and 0 otherwise, computed from per-class sums
+    of the centered `K_x` without materializing one-hot labels.
+
+    Leading dimensions of `K_x` are treated as batch dimensions.
+
+
+    Arguments:
+        K_x (torch.Tensor): Gram matrix (or stack of Gram matrices) of shape (..., m, m)
+        labels (torch.Tensor): class labels of shape (m,) with values in [0, num_classes)
+        num_classes (int): number of classes
+
+    Returns:
+        (torch.Tensor): HSIC estimate of shape (...)
+
+    """
+    m = K_x.shape[-1]
+    K = center(K_x)
+    batch_shape = K.shape[:-2]
+    class_sums = K.new_zeros(batch_shape + (num_classes, m))
+    class_sums = class_sums.index_add(len(batch_shape), labels, K)
+    index = labels.expand(batch_shape + (1, m))
+    return torch.sum(class_sums.gather(-2, index), dim=(-2, -1)) / (m - 1)
+
+
+def hsic_cross(K_a, K_b, estimate="biased", inplace=False):
+    """
+    HSIC estimates between every Gram matrix of the stack `K_a` and every
+    Gram matrix of the stack `K_b`. Centering is done once per matrix and
+    the traces of all the pairs are obtained with a single batched matmul.
+
+
+    Arguments:
+        K_a (torch.Tensor): stack of Gram matrices of shape (..., A, m, m)
+        K_b (torch.Tensor): stack of Gram matrices of shape (..., B, m, m)
+        estimate (str, optional): 'biased' or 'unbiased' HSIC estimate (default: 'biased')
+        inplace (bool, optional): if true then `K_a` is centered in place for the biased estimate, see :func:`center` (default: False)
+
+    Returns:
+        (torch.Tensor): HSIC estimates of shape (..., A, B)
+
+    """
+    m = K_a.shape[-1]
+    if estimate == "biased":
+        K_a = center(K_a, inplace).flatten(-2)
+        return torch.matmul(K_a, K_b.flatten(-2).transpose(-2, -1)) / (m - 1)
+    elif estimate == "unbiased":
+        if m < 4:
+            raise Exception("Unbiased HSIC estimate requires at least 4 samples")
+        off_diagonal = 1 - torch.eye(m, dtype=K_a.dtype, device=K_a.device)
+        K = K_a * off_diagonal
+        L = K_b * off_diagonal
+        row_K = torch.sum(K, dim=-1)
+        row_L = torch.sum(L, dim=-1)
+        sum_K = torch.sum(row_K, dim=-1).unsqueeze(-1)
+        sum_L = torch.sum(row_L, dim=-1).unsqueeze(-2)
+        trace_KL = torch.matmul(K.flatten(-2), L.flatten(-2).transpose(-2, -1))
+        cross_KL = torch.matmul(row_K, row_L.transpose(-2, -1))
+        return (
+            trace_KL + sum_K * sum_L / ((m - 1) * (m - 2)) - (2 / (m - 2)) * cross_KL
+        ) / (m * (m - 3))
+    else:
+        raise ValueError("Could not interpret " "HSIC estimate identifier:", estimate)
+
+
+def get_estimate(estimate):
+    if estimate == "biased":
+        return hsic_biased
+    elif estimate == "unbiased":
+        return hsic_unbiased
+    else:
+        raise ValueError("Could not interpret " "HSIC estimate identifier:", estimate)
+
+
+def hsic_features(phi_x, phi_y, estimate="biased"):
+    """
+    HSIC estimate for kernels given by explicit feature maps
+    `K_x = phi_x phi_x^T` and `K_y = phi_y phi_y^T`, computed from the
+    cross-covariance `phi_x^T phi_y` in O(m D_x D_y) without forming any
+    m x m matrix. Uses the same normalizations as :func:`hsic_biased` and
+    :func:`hsic_unbiased`.
+
+    """
+    m = phi_x.shape[0]
+    if estimate == "biased":
+        phi_x = phi_x - phi_x.mean(dim=0, keepdim=True)
+        phi_y = phi_y - phi_y.mean(dim=0, keepdim=True)
+        cross_covariance = torch.mm(phi_x.t(), phi_y)
+        return torch.sum(cross_covariance ** 2) / (m - 1)
+    elif estimate == "unbiased":
+        if m < 4:
+            raise Exception("Unbiased HSIC estimate requires at least 4 samples")
+        # diagonal of the Gram matrices is removed analytically
+        diag_K = torch.sum(phi_x ** 2, dim=1)
+        diag_L = torch.sum(phi_y ** 2, dim=1)
+        row_K = torch.mv(phi_x, torch.sum(phi_x, dim=0)) - diag_K
+        row_L = torch.mv(phi_y, torch.sum(phi_y, dim=0)) - diag_L
+        trace_KL = torch.sum(torch.mm(phi_x.t(), phi_y) ** 2) - torch.sum(
+            diag_K * diag_L
+        )
+        return (
+            trace_KL
+            + torch.sum(row_K) * torch.sum(row_L) / ((m - 1) * (m - 2))
+            - (2 / (m - 2)) * torch.sum(row_K * row_L)
+        ) / (m * (m - 3))
+    else:
+        raise ValueError("Could not interpret " "HSIC estimate identifier:", estimate)
+
+
+_local = threading.local()  # stack of the active Gram caches of every thread
+
+
+class GramCache:
+    """
+    Per-batch cache of Gram matrices which is shared across layers and
+    evaluators so that every kernel matrix of a batch is computed only once.
+
+    Entries are keyed by the identity of the underlying tensor (storage,
+    shape, stride and version) together with the kernel and its parameters.
+    The cache is activated for the current thread with a `with` statement
+    and should be cleared with :meth:`clear` when the batch ends. Several
+    threads can share a cache, values are computed outside of its lock.
+
+    Attributes:
+        hits (int): number of lookups which were served from the cache
+        misses (int): number of lookups which needed computation
+
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def lookup(self, tensor, tag, params_dict, compute):
+        """
+        Returns the cached value for `tensor` and kernel identified by `tag`
+        and `params_dict`, calls `compute` to obtain it on a miss.
+
+        """
+        key = (
+            tag,
+            tensor.data_ptr(),
+            tuple(tensor.shape),
+            tuple(tensor.stride()),
+            tensor.dtype,
+            tensor.device,
+            tensor._version,
+            tuple(sorted((k, repr(v)) for k, v in params_dict.items())),
+        )
+        with self.lock:
+            if key in self.entries.keys():
+                self.hits += 1
+                return self.entries[key][1]
+            self.misses += 1
+        value = compute()
+        with self.lock:
+            # keep a reference to the tensor so that its storage is not reused
+            return self.entries.setdefault(key, (tensor, value))[1]
+
+    def clear(self):
+        with self.lock:
+            self.entries = {}
+
+    def __enter__(self):
+        if not hasattr(_local, "caches"):
+            _local.caches = []
+        _local.caches.append(self)
+        return self
+
+    def __exit__(self, *args):
+        _local.caches.pop()
+
+
+def active_cache():
+    """
+    Returns the innermost :class:`GramCache` activated on the current thread
+    or None.
+
+    """
+    caches = getattr(_local, "caches", None)
+    if caches:
+        return caches[-1]
+    return None
+
+
+def cached(tensor, tag, params_dict, compute):
+    """
+    Looks up `compute()` in the active :class:`GramCache`, tensors which
+    require gradient are never cached.
+
+    """
+    cache = active_cache()
+    if cache is None or tensor.requires_grad:
+        return compute()
+    return cache.lookup(tensor, tag, params_dict, compute)
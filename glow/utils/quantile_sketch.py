@@ -0,0 +1,252 @@
+import math
+import random
+import threading
+import torch
+
+
+_local = threading.local()
+
+
+class QuantileSketch:
+    """
+    KLL streaming quantile sketch kept for every column of a stream of
+    (m, d) tensors at once, that is one sketch per neuron of a layer.
+
+    Items are kept in compactors (levels), an item at level h stands for
+    2^h items of the stream. When a level grows beyond its capacity it is
+    sorted and every other item (starting at a random offset) is promoted to
+    the next level. Capacities shrink geometrically from the top level down,
+    so the number of items kept stays close to `k / (1 - c)` per neuron
+    regardless of the number of batches seen. Since every column receives the
+    same number of items the levels of all the neurons have the same size
+    and are stored as (n, d) tensors.
+
+    The sketch only holds tensors and a :class:`random.Random` object so it
+    can be pickled, and sketches built on different data loader workers or
+    processes can be combined with :meth:`merge`.
+
+
+    Arguments:
+        k (int, optional): capacity of the top level which controls the accuracy, rank error is roughly proportional to 1/k (default: 200)
+        c (float, optional): ratio between the capacities of consecutive levels (default: 2/3)
+        seed (int, optional): seed for the random compaction offsets (default: 0)
+
+    Attributes:
+        count (int): number of rows seen by the sketch
+        levels (iterable): list of compactors of shape (n_h, d)
+        min (torch.Tensor): exact per-column minimum of the stream
+        max (torch.Tensor): exact per-column maximum of the stream
+
+    """
+
+    def __init__(self, k=200, c=2 / 3, seed=0):
+        self.k = k
+        self.c = c
+        self.random = random.Random(seed)
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.levels = []
+        self.min = None
+        self.max = None
+
+    def capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * self.c ** depth)))
+
+    def update(self, t):
+        """
+        Adds the rows of `t` of shape (m, d) to the sketch.
+
+        """
+        t = t.detach().reshape(t.shape[0], -1)
+        if not t.is_floating_point():
+            t = t.float()
+        if self.count == 0:
+            self.levels = [t.clone()]
+            self.min = torch.min(t, dim=0).values
+            self.max = torch.max(t, dim=0).values
+        else:
+            self.levels[0] = torch.cat([self.levels[0], t.to(self.levels[0])])
+            self.min = torch.min(self.min, torch.min(t, dim=0).values)
+            self.max = torch.max(self.max, torch.max(t, dim=0).values)
+        self.count += t.shape[0]
+        self.compress()
+
+    def merge(self, other):
+        """
+        Combines the summary of `other` (built with the same `k` over streams
+        of the same width) into this sketch.
+
+        """
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.levels = [level.clone() for level in other.levels]
+            self.min, self.max = other.min.clone(), other.max.clone()
+        else:
+            for h, level in enumerate(other.levels):
+                level = level.to(self.levels[0])
+                if h < len(self.levels):
+                    self.levels[h] = torch.cat([self.levels[h], level])
+                else:
+                    self.levels.append(level.clone())
+            self.min = torch.min(self.min, other.min.to(self.min))
+            self.max = torch.max(self.max, other.max.to(self.max))
+        self.count += other.count
+        self.compress()
+        return self
+
+    def compress(self):
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            n = level.shape[0]
+            if n <= self.capacity(h):
+                h += 1
+                continue
+            if h + 1 == len(self.levels):
+                self.levels.append(level[:0])
+            # an odd item out stays at this level
+            keep = n % 2
+            level = torch.sort(level.t().contiguous(), dim=1).values
+            offset = self.random.randint(0, 1)
+            promoted = level[:, offset : n - keep : 2].t()
+            self.levels[h] = level[:, n - keep :].t().contiguous()
+            self.levels[h + 1] = torch.cat([self.levels[h + 1], promoted])
+            # capacities depend on the number of levels, start over
+            h = 0
+
+    def quantiles(self, q):
+        """
+        Approximate per-column quantiles of the stream.
+
+        Arguments:
+            q (torch.Tensor): quantile levels in [0, 1] of shape (Q,)
+
+        Returns:
+            (torch.Tensor): quantiles of shape (Q, d), the quantiles 0 and 1 are the exact minimum and maximum
+
+        """
+        if self.count == 0:
+            raise Exception("Cannot compute quantiles of an empty sketch")
+        items = torch.cat(self.levels)
+        weights = torch.cat(
+            [
+                torch.full((level.shape[0],), 2.0 ** h, device=items.device)
+                for h, level in enumerate(self.levels)
+            ]
+        ).double()
+        values, index = torch.sort(items.t().contiguous(), dim=1)
+        cum_weights = torch.cumsum(weights[index], dim=1)
+        q = torch.as_tensor(q, dtype=torch.float64, device=items.device)
+        targets = (q * cum_weights[:, -1:]).contiguous()
+        position = torch.searchsorted(cum_weights, targets)
+        position = torch.clamp(position, max=values.shape[1] - 1)
+        result = torch.gather(values, 1, position).t().contiguous()
+        result[q <= 0] = self.min
+        result[q >= 1] = self.max
+        return result
+
+    def bin_edges(self, num_bins):
+        """
+        Equal mass bin edges of shape (num_bins + 1, d) for every column.
+
+        """
+        q = torch.linspace(0, 1, num_bins + 1, dtype=torch.float64)
+        return self.quantiles(q)
+
+
+class ActivationSketches:
+    """
+    One :class:`QuantileSketch` per tracked layer of a model, updated with the
+    hidden outputs collected in the forward pass.
+
+    Binning based estimators read the per-layer bin edges of the sketches
+    activated on the current thread with a `with` statement, see
+    :func:`active_sketches`. Updates and reads are guarded by a lock so the
+    sketches can be read by background evaluation threads while the forward
+    pass updates them.
+
+
+    Arguments:
+        k (int, optional): capacity of the sketches (default: 200)
+        seed (int, optional): seed for the random compaction offsets (default: 0)
+
+    Attributes:
+        sketches (iterable): list of :class:`QuantileSketch` with one sketch for each layer
+
+    """
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.seed = seed
+        self.sketches = []
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def update(self, hidden_outputs):
+        """
+        Adds a batch of hidden outputs (one tensor per layer) to the sketches.
+
+        """
+        with self.lock:
+            for idx, t in enumerate(hidden_outputs):
+                if idx == len(self.sketches):
+                    self.sketches.append(QuantileSketch(self.k, seed=self.seed + idx))
+                self.sketches[idx].update(t)
+
+    def merge(self, other):
+        with self.lock:
+            for idx, sketch in enumerate(other.sketches):
+                if idx == len(self.sketches):
+                    self.sketches.append(QuantileSketch(self.k, seed=self.seed + idx))
+                self.sketches[idx].merge(sketch)
+        return self
+
+    def reset(self):
+        with self.lock:
+            self.sketches = []
+
+    def bin_edges(self, layer, num_bins):
+        """
+        Bin edges of shape (num_bins + 1, d) for the layer with index `layer`
+        or None if that layer has not been sketched.
+
+        """
+        with self.lock:
+            if layer < 0 or layer >= len(self.sketches):
+                return None
+            if self.sketches[layer].count == 0:
+                return None
+            return self.sketches[layer].bin_edges(num_bins)
+
+    def __enter__(self):
+        if not hasattr(_local, "sketches"):
+            _local.sketches = []
+        _local.sketches.append(self)
+        return self
+
+    def __exit__(self, *args):
+        _local.sketches.pop()
+
+
+def active_sketches():
+    """
+    Returns the innermost :class:`ActivationSketches` activated on the current
+    thread or None.
+
+    """
+    sketches = getattr(_local, "sketches", None)
+    if sketches:
+        return sketches[-1]
+    return None
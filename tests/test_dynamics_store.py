@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+import torch
+from glow.dynamics import DynamicsStore
+
+
+def write_epoch(store, epoch, steps, num_layers=2):
+    for step in steps:
+        coordinates = torch.full((num_layers, 2), float(step))
+        store.add_coordinates(epoch, step, [coordinates])
+    store.end_epoch()
+
+
+def test_refuses_non_empty_directory(tmp_path):
+    write_epoch(DynamicsStore(str(tmp_path)), 0, [0, 1])
+    with pytest.raises(Exception, match="append=True"):
+        DynamicsStore(str(tmp_path))
+
+
+def test_appended_runs_continue_numbering(tmp_path):
+    store = DynamicsStore(str(tmp_path))
+    write_epoch(store, 0, [0, 1])
+    write_epoch(store, 1, [2, 3])
+    # a second run counts its epochs and steps from 0 again
+    store.start_run()
+    write_epoch(store, 0, [0, 1])
+    store = DynamicsStore(str(tmp_path), append=True)
+    write_epoch(store, 0, [0])
+    index = store.index()
+    index = index[index["layer"] == 0]
+    assert list(index["run"]) == [0, 0, 0, 0, 1, 1, 2]
+    assert list(index["epoch"]) == [0, 0, 1, 1, 2, 2, 3]
+    steps, coordinates = store.coordinates(0, 1)
+    assert list(steps) == [0, 1, 2, 3, 4, 5, 6]
+    np.testing.assert_array_equal(coordinates[:, 0], [0, 1, 2, 3, 0, 1, 0])
+    steps, _ = store.coordinates(0, 0, run=1)
+    assert list(steps) == [4, 5]
+
+
+def test_rejects_incompatible_shapes(tmp_path):
+    write_epoch(DynamicsStore(str(tmp_path)), 0, [0])
+    store = DynamicsStore(str(tmp_path), append=True)
+    with pytest.raises(Exception, match="shape"):
+        store.add_coordinates(0, 0, [torch.zeros(2, 3)])
+
+
+def test_append_after_interrupted_epoch(tmp_path):
+    store = DynamicsStore(str(tmp_path), chunk_bytes=1)
+    write_epoch(store, 0, [0])
+    # the run stops after a chunk was written but before the epoch ended
+    store.add_coordinates(1, 1, [torch.full((2, 2), 104.0)])
+    store = DynamicsStore(str(tmp_path), append=True)
+    write_epoch(store, 0, [7])
+    steps, coordinates = store.coordinates(0, 0)
+    assert list(steps) == [0, 8]
+    np.testing.assert_array_equal(coordinates[:, 0], [0.0, 7.0])
@@ -0,0 +1,61 @@
+import pytest
+import torch
+import glow.hash_functions as hash_module
+from glow.information_bottleneck import EDGE
+
+
+def samples(m=2000, dim=16, seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    x = torch.randn(m, 64, generator=generator)
+    h = torch.relu(x @ torch.randn(64, dim, generator=generator) / 4)
+    y = torch.randint(0, 10, (m,), generator=generator)
+    return x, h, y
+
+
+def test_ensemble_floor_hash_matches_floor_hash():
+    _, h, _ = samples()
+    offsets = 0.5 * torch.rand(8, generator=torch.Generator().manual_seed(1))
+    ids = hash_module.ensemble_floor_hash(h, 0.5, offsets)
+    for k, b in enumerate(offsets):
+        expected = hash_module.pack_codes(hash_module.floor_hash(h, 0.5, b))
+        # same partition of the samples up to relabelling
+        pairs = torch.unique(torch.stack([ids[k], expected], dim=1), dim=0)
+        assert pairs.shape[0] == torch.unique(ids[k]).shape[0]
+        assert pairs.shape[0] == torch.unique(expected).shape[0]
+
+
+def test_floor_hash_states_match_floor_hash():
+    _, h, _ = samples()
+    offsets = torch.sort(
+        0.5 * torch.rand(64, generator=torch.Generator().manual_seed(2))
+    )[0]
+    samples_, starts, ids, _ = hash_module.floor_hash_states(h, 0.5, offsets)
+    for k, b in enumerate(offsets):
+        # the state of every sample holding at rank k
+        active = torch.nonzero(starts <= k)[:, 0]
+        last = torch.zeros(h.shape[0], dtype=torch.long)
+        last = last.scatter_reduce(0, samples_[active], active, "amax")
+        current = ids[last]
+        expected = hash_module.pack_codes(hash_module.floor_hash(h, 0.5, b))
+        pairs = torch.unique(torch.stack([current, expected], dim=1), dim=0)
+        assert pairs.shape[0] == torch.unique(current).shape[0]
+        assert pairs.shape[0] == torch.unique(expected).shape[0]
+
+
+@pytest.mark.parametrize("ensemble_size", [8, 32, 128])
+def test_ensemble_matches_separate_criterion_calls(ensemble_size):
+    x, h, y = samples()
+    ensemble = EDGE(
+        "floor_hash", gpu=False, ensemble_size=ensemble_size, F=1.0, epsilon=0.5
+    )
+    for target in [y, x]:
+        values = [
+            EDGE("floor_hash", gpu=False, b=float(b), F=1.0, epsilon=0.5).criterion(
+                h, target
+            )
+            for b in ensemble.offsets
+        ]
+        values = torch.stack(values)
+        mean, spread = ensemble.ensemble_criterion(h, target)
+        assert torch.allclose(mean, values.mean(), rtol=1e-5)
+        assert torch.allclose(spread, values.std(unbiased=False), rtol=1e-4, atol=1e-6)
@@ -0,0 +1,90 @@
+import pytest
+import torch
+from glow.information_bottleneck import HSIC, NystromHSIC, RandomFeatureHSIC
+
+
+def dependent_samples(m=500, seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    x = torch.randn(m, 5, generator=generator, dtype=torch.float64)
+    W = torch.randn(5, 3, generator=generator, dtype=torch.float64)
+    noise = torch.randn(m, 3, generator=generator, dtype=torch.float64)
+    return x, torch.tanh(x @ W) + 0.1 * noise
+
+
+def relative_errors(num_features, seeds, x, y, sigma=2.0):
+    exact = HSIC("gaussian", gpu=False, dtype=torch.float64, sigma=sigma)
+    exact = exact.criterion(x, y).item()
+    errors = []
+    for seed in seeds:
+        approximate = RandomFeatureHSIC(
+            num_features, seed=seed, gpu=False, dtype=torch.float64, sigma=sigma
+        )
+        errors.append(abs(approximate.criterion(x, y).item() - exact) / exact)
+    return errors
+
+
+def test_random_feature_hsic_error_bound():
+    x, y = dependent_samples()
+    assert max(relative_errors(4096, range(5), x, y)) < 0.1
+
+
+def test_random_feature_hsic_error_decreases_with_features():
+    x, y = dependent_samples()
+    coarse = relative_errors(64, range(5), x, y)
+    fine = relative_errors(4096, range(5), x, y)
+    assert sum(fine) < 0.5 * sum(coarse)
+
+
+def test_random_feature_hsic_independent_samples():
+    x, _ = dependent_samples(seed=0)
+    _, y = dependent_samples(seed=1)
+    exact = HSIC("gaussian", gpu=False, dtype=torch.float64, sigma=2.0)
+    approximate = RandomFeatureHSIC(
+        4096, seed=0, gpu=False, dtype=torch.float64, sigma=2.0
+    )
+    dependent = exact.criterion(*dependent_samples()).item()
+    assert approximate.criterion(x, y).item() == pytest.approx(
+        exact.criterion(x, y).item(), abs=0.05 * dependent
+    )
+
+
+def test_random_feature_hsic_image_inputs():
+    generator = torch.Generator().manual_seed(0)
+    x = torch.randn(300, 2, 3, 3, generator=generator, dtype=torch.float64)
+    y = torch.tanh(x.sum(dim=(2, 3)))
+    assert max(relative_errors(4096, range(3), x, y, sigma=4.0)) < 0.1
+
+
+def nystrom_errors(num_landmarks, x, y, landmarks="uniform", sigma=2.0):
+    exact = HSIC("gaussian", gpu=False, dtype=torch.float64, sigma=sigma)
+    exact = exact.criterion(x, y).item()
+    errors = []
+    for seed in range(3):
+        approximate = NystromHSIC(
+            "gaussian",
+            num_landmarks,
+            landmarks,
+            seed=seed,
+            gpu=False,
+            dtype=torch.float64,
+            sigma=sigma,
+        )
+        errors.append(abs(approximate.criterion(x, y).item() - exact) / exact)
+    return errors
+
+
+@pytest.mark.parametrize("landmarks", ["uniform", "kmeans++"])
+def test_nystrom_hsic_error_decreases_with_rank(landmarks):
+    x, y = dependent_samples()
+    coarse = nystrom_errors(16, x, y, landmarks)
+    fine = nystrom_errors(256, x, y, landmarks)
+    assert max(fine) < 0.05
+    assert sum(fine) < 0.5 * sum(coarse)
+
+
+@pytest.mark.parametrize("landmarks", ["uniform", "kmeans++"])
+def test_nystrom_hsic_image_inputs(landmarks):
+    generator = torch.Generator().manual_seed(0)
+    x = torch.randn(300, 2, 3, 3, generator=generator, dtype=torch.float64)
+    y = torch.tanh(x.sum(dim=(2, 3)))
+    assert max(nystrom_errors(256, x, y, landmarks, sigma=4.0)) < 0.05
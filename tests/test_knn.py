@@ -0,0 +1,36 @@
+import math
+import torch
+from glow.information_bottleneck import KNN, KSG
+
+
+def correlated_gaussians(m=4000, rho=0.8, seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    x = torch.randn(m, 1, generator=generator)
+    noise = torch.randn(m, 1, generator=generator)
+    return x, rho * x + math.sqrt(1 - rho ** 2) * noise
+
+
+def test_low_dimensional_gaussians():
+    # close neighbours in one dimension cancel out in the Gram trick
+    x, y = correlated_gaussians(rho=0.8)
+    expected = -0.5 * math.log2(1 - 0.8 ** 2)
+    for estimator in [KNN(gpu=False), KSG(gpu=False), KSG(p=math.inf, gpu=False)]:
+        assert abs(estimator.criterion(x, y).item() - expected) < 0.1
+
+
+def test_offset_gaussians():
+    x, y = correlated_gaussians(m=2000, rho=0.6)
+    expected = -0.5 * math.log2(1 - 0.6 ** 2)
+    for estimator in [KNN(gpu=False), KSG(gpu=False)]:
+        value = estimator.criterion(x + 1000.0, y - 1000.0).item()
+        assert abs(value - expected) < 0.15
+
+
+def test_duplicated_samples():
+    x, y = correlated_gaussians(m=1000)
+    x = torch.cat([x, x[:100]])
+    y = torch.cat([y, y[:100]])
+    labels = (y[:, 0] > 0).long()
+    for estimator in [KNN(gpu=False), KSG(gpu=False)]:
+        for target in [y, labels]:
+            assert math.isfinite(estimator.criterion(x, target).item())
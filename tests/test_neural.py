@@ -0,0 +1,31 @@
+import math
+import torch
+from glow.information_bottleneck import MINE, InfoNCE
+
+
+def correlated_gaussians(m=512, rho=0.8, seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    x = torch.randn(m, 2, generator=generator)
+    noise = torch.randn(m, 2, generator=generator)
+    return x, rho * x + math.sqrt(1 - rho ** 2) * noise
+
+
+def test_global_rng_untouched():
+    x, y = correlated_gaussians()
+    torch.manual_seed(1)
+    expected = torch.rand(4)
+    for estimator in [MINE(num_steps=2, gpu=False), InfoNCE(num_steps=2, gpu=False)]:
+        torch.manual_seed(1)
+        estimator.criterion(x, y)
+        assert torch.equal(torch.rand(4), expected)
+
+
+def test_seeded_networks():
+    x, y = correlated_gaussians()
+    for estimator_class in [MINE, InfoNCE]:
+        values = []
+        for global_seed in [1, 2]:
+            torch.manual_seed(global_seed)
+            estimator = estimator_class(num_steps=5, gpu=False)
+            values.append(estimator.criterion(x, y).item())
+        assert values[0] == values[1]
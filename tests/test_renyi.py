@@ -0,0 +1,33 @@
+import pytest
+import torch
+from glow.information_bottleneck import MatrixRenyi
+
+
+def normalized_grams(m=1024, seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    x = torch.randn(m, 64, generator=generator)
+    h = torch.tanh(x @ torch.randn(64, 32, generator=generator) / 4)
+    estimator = MatrixRenyi("gaussian", method="exact", gpu=False, sigma=8.0)
+    A_x, A_h = estimator.normalized_gram(x), estimator.normalized_gram(h)
+    A_xh = A_x * A_h
+    return [A_x, A_h, A_xh / torch.trace(A_xh)]
+
+
+@pytest.mark.parametrize("alpha", [1.0, 1.01, 1.5, 3.0])
+def test_stochastic_entropy_error(alpha):
+    exact = MatrixRenyi("gaussian", alpha, "exact", gpu=False, sigma=8.0)
+    stochastic = MatrixRenyi("gaussian", alpha, "stochastic", gpu=False, sigma=8.0)
+    for A in normalized_grams():
+        reference = exact.entropy(A).item()
+        assert stochastic.entropy(A).item() == pytest.approx(reference, rel=0.01)
+
+
+@pytest.mark.parametrize("alpha", [1.01, 2.0])
+def test_stochastic_mutual_information_error(alpha):
+    generator = torch.Generator().manual_seed(1)
+    x = torch.randn(1024, 64, generator=generator)
+    h = torch.tanh(x @ torch.randn(64, 32, generator=generator) / 4)
+    exact = MatrixRenyi("gaussian", alpha, "exact", gpu=False, sigma=8.0)
+    stochastic = MatrixRenyi("gaussian", alpha, "stochastic", gpu=False, sigma=8.0)
+    reference = exact.criterion(h, x).item()
+    assert stochastic.criterion(h, x).item() == pytest.approx(reference, abs=0.05)